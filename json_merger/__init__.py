@@ -422,6 +422,17 @@ heuristics to speed up the distance function matching.
 
 These instances can be used as class parameters for
 ``DistanceFunctionComparator``
+
+For long author lists, ``AuthorNameCandidates`` can be used as the
+``candidates_function`` of the comparator so that only the authors sharing a
+last name token (and optionally a first name initial) are compared.
+
+>>> from json_merger.contrib.inspirehep.author_util import (
+...     AuthorNameCandidates)
+>>> candidates = AuthorNameCandidates(simple_tokenize, use_initials=True)
+>>> list(candidates([{'full_name': 'Doe, J.'}, {'full_name': 'Roe, J.'}],
+...                 [{'full_name': 'Doe, John'}, {'full_name': 'Doe, A.'}]))
+[(0, 0)]
 """
 
 from __future__ import absolute_import, print_function
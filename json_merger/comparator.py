@@ -24,12 +24,28 @@
 
 from __future__ import absolute_import, print_function
 
+import time
+
+import six
+from pyrsistent import freeze
+
+from .errors import TimeBudgetExceededError
 from .nothing import NOTHING
 from .utils import get_obj_at_key_path
 
+# Hashable placeholder for the missing fields in the keys of an object.
+_MISSING_FIELD = object()
+
 
 class BaseComparator(object):
-    """Abstract base class for Entity Comparison."""
+    """Abstract base class for Entity Comparison.
+
+    Matches are computed lazily. Comparators that only implement ``equal``
+    compare an element with the other list the first time its matches are
+    requested, so indices that are never queried are never compared.
+    Comparators that override ``process_lists`` compute all the matches on
+    the first query and index them by element for the next ones.
+    """
 
     def __init__(self, l1, l2):
         """
@@ -39,20 +55,98 @@ class BaseComparator(object):
         """
         self.l1 = l1
         self.l2 = l2
-        self.matches = set()
-        self.process_lists()
+        self._matches = set()
+        self._processed = False
+        # Per index results of lazy pairwise matching.
+        self._l1_rows = {}
+        self._l2_rows = {}
+        # Per index view of the matches, built once they are all computed.
+        self._match_rows = None
+        # Wall-clock time after which matching is aborted, set by the list
+        # unifier when it has a time budget.
+        self.deadline = None
+
+    @property
+    def matches(self):
+        """Set of all the pairs of matching indices between l1 and l2."""
+        if not self._processed:
+            self._processed = True
+            self.process_lists()
+        return self._matches
+
+    @matches.setter
+    def matches(self, value):
+        self._matches = value
+        self._match_rows = None
 
     def process_lists(self):
         """Do any preprocessing of the lists."""
-        for l1_idx, obj1 in enumerate(self.l1):
-            for l2_idx, obj2 in enumerate(self.l2):
-                if self.equal(obj1, obj2):
-                    self.matches.add((l1_idx, l2_idx))
+        for l1_idx in range(len(self.l1)):
+            self.check_deadline()
+            self._matches.update((l1_idx, l2_idx)
+                                 for l2_idx in self._get_row('l1', l1_idx))
 
     def equal(self, obj1, obj2):
         """Implementation of object equality."""
         raise NotImplementedError()
 
+    def check_deadline(self):
+        """Raise TimeBudgetExceededError if the deadline has passed.
+
+        Comparators overriding ``process_lists`` should call it regularly
+        while computing the matches.
+        """
+        if self.deadline is not None and time.time() > self.deadline:
+            raise TimeBudgetExceededError(
+                'Time budget exceeded while matching list entities.')
+
+    def _is_pairwise(self):
+        return (six.get_unbound_function(type(self).process_lists) is
+                six.get_unbound_function(BaseComparator.process_lists))
+
+    def _get_row(self, src, src_idx):
+        if src == 'l1':
+            rows, other_rows = self._l1_rows, self._l2_rows
+        else:
+            rows, other_rows = self._l2_rows, self._l1_rows
+        if src_idx in rows:
+            return rows[src_idx]
+
+        if src == 'l1':
+            src_obj = self.l1[src_idx]
+            target_list = self.l2
+        else:
+            src_obj = self.l2[src_idx]
+            target_list = self.l1
+
+        row = []
+        for trg_idx, trg_obj in enumerate(target_list):
+            # Reuse the result if the pair was already compared the other way.
+            if trg_idx in other_rows:
+                if src_idx in other_rows[trg_idx]:
+                    row.append(trg_idx)
+                continue
+            if src == 'l1':
+                is_equal = self.equal(src_obj, trg_obj)
+            else:
+                is_equal = self.equal(trg_obj, src_obj)
+            if is_equal:
+                row.append(trg_idx)
+        rows[src_idx] = row
+        return row
+
+    def _get_match_rows(self):
+        if self._match_rows is None:
+            rows = {'l1': {}, 'l2': {}}
+            for l1_idx, l2_idx in self.matches:
+                rows['l1'].setdefault(l1_idx, []).append(l2_idx)
+                rows['l2'].setdefault(l2_idx, []).append(l1_idx)
+            for src_rows in rows.values():
+                for row in src_rows.values():
+                    row.sort()
+            self._match_rows = rows
+        return self._match_rows
+
     def get_matches(self, src, src_idx):
         """Get elements equal to the idx'th in src from the other list.
 
@@ -65,13 +159,13 @@ class BaseComparator(object):
             target_list = self.l2
         else:
             target_list = self.l1
-        comparator = {
-            'l1': lambda s_idx, t_idx: (s_idx, t_idx) in self.matches,
-            'l2': lambda s_idx, t_idx: (t_idx, s_idx) in self.matches,
-        }[src]
 
-        return [(trg_idx, obj) for trg_idx, obj in enumerate(target_list)
-                if comparator(src_idx, trg_idx)]
+        if not self._processed and self._is_pairwise():
+            return [(trg_idx, target_list[trg_idx])
+                    for trg_idx in self._get_row(src, src_idx)]
+
+        row = self._get_match_rows()[src].get(src_idx, [])
+        return [(trg_idx, target_list[trg_idx]) for trg_idx in row]
 
 
 class PrimaryKeyComparator(BaseComparator):
@@ -121,6 +215,31 @@ class PrimaryKeyComparator(BaseComparator):
         fn = self.normalization_functions.get(field, lambda x: x)
         return fn(o1) == fn(o2)
 
+    def get_keys(self, obj):
+        """Returns the hashable keys of the object.
+
+        Two objects share a key if they are equal, see
+        :func:`keyed_comparator`.
+        """
+        keys = [('obj', freeze(obj))]
+        for idx, field_set in enumerate(self.primary_key_fields):
+            if not isinstance(field_set, list):
+                field_set = [field_set]
+            values = []
+            for field in field_set:
+                key_path = tuple(k for k in field.split('.') if k)
+                value = get_obj_at_key_path(obj, key_path, NOTHING)
+                if value == NOTHING:
+                    value = _MISSING_FIELD
+                else:
+                    fn = self.normalization_functions.get(field, lambda x: x)
+                    value = freeze(fn(value))
+                values.append(value)
+            # Objects missing all the fields of a set do not match on it.
+            if any(value is not _MISSING_FIELD for value in values):
+                keys.append((idx, tuple(values)))
+        return keys
+
     def _are_fields_nothing(self, obj1, obj2, field):
         o1, o2 = self._get_compared_objects_at_field_path(obj1, obj2, field)
         if o1 == NOTHING or o2 == NOTHING:
@@ -145,8 +264,79 @@ class PrimaryKeyComparator(BaseComparator):
         return False
 
 
+class KeyComparator(BaseComparator):
+    """Two objects are the same entity if they have the same key.
+
+    The matches are found with a hash join on the keys so the lists are
+    matched in linear time. Objects having ``None`` as a key do not match
+    anything. By default the key is an immutable copy of the whole object.
+    """
+
+    def get_key(self, obj):
+        """Returns a hashable key for the object or None."""
+        return freeze(obj)
+
+    def get_keys(self, obj):
+        """Returns the hashable keys of the object."""
+        key = self.get_key(obj)
+        return [] if key is None else [key]
+
+    def equal(self, obj1, obj2):
+        key = self.get_key(obj1)
+        return key is not None and key == self.get_key(obj2)
+
+    def process_lists(self):
+        _process_lists_by_keys(self)
+
+
+class EqualityKeyComparator(KeyComparator):
+    """Two objects are the same entity if they are fully equal.
+
+    Matches the same JSON entities as :class:`DefaultComparator` but with a
+    hash join on the frozen objects instead of comparing them pairwise.
+    """
+
+    def get_key(self, obj):
+        # Wrap the frozen object so that null entities also have a key.
+        return (freeze(obj), )
+
+    def equal(self, obj1, obj2):
+        return obj1 == obj2
+
+
 class DefaultComparator(BaseComparator):
     """Two objects are the same entity if they are fully equal."""
 
     def equal(self, obj1, obj2):
         return obj1 == obj2
+
+    def get_keys(self, obj):
+        """Returns the hashable keys of the object."""
+        return [(freeze(obj), )]
+
+
+def keyed_comparator(comparator_cls):
+    """Returns a version of the comparator matching with a hash join.
+
+    Two objects match if they share one of the keys returned by the
+    ``get_keys`` method of the comparator, without calling ``equal``.
+    Returns None if the comparator does not define ``get_keys``.
+    """
+    if issubclass(comparator_cls, KeyComparator):
+        return comparator_cls
+    if getattr(comparator_cls, 'get_keys', None) is None:
+        return None
+    return type(str('Keyed' + comparator_cls.__name__), (comparator_cls, ),
+                {'process_lists': _process_lists_by_keys})
+
+
+def _process_lists_by_keys(comparator):
+    l2_by_key = {}
+    for l2_idx, obj in enumerate(comparator.l2):
+        for key in comparator.get_keys(obj):
+            l2_by_key.setdefault(key, []).append(l2_idx)
+
+    for l1_idx, obj in enumerate(comparator.l1):
+        for key in comparator.get_keys(obj):
+            for l2_idx in l2_by_key.get(key, []):
+                comparator.matches.add((l1_idx, l2_idx))
@@ -88,3 +88,76 @@ class UnifierOps(object):
 
 for mode in UnifierOps.allowed_ops:
     setattr(UnifierOps, mode, mode)
+
+
+class UnifierFallbackOps(object):
+    """Possible strategies for a list that exceeds its unification limits.
+
+    Attributes:
+        KEYED_ONLY: Match only the entities sharing one of the keys given
+            by the ``get_keys`` method of the configured comparator, e.g. the
+            primary keys of a
+            :class:`json_merger.comparator.PrimaryKeyComparator`, using a
+            hash join. Comparators without keys fall back to KEEP_HEAD.
+
+        KEEP_HEAD: Keep the `head` list as it is.
+
+        RAISE: Raise :class:`json_merger.errors.MaxThresholdExceededError`.
+    """
+    allowed_ops = [
+        'KEYED_ONLY',
+        'KEEP_HEAD',
+        'RAISE',
+    ]
+
+
+for mode in UnifierFallbackOps.allowed_ops:
+    setattr(UnifierFallbackOps, mode, mode)
+
+
+class UnifierLimits(object):
+    """Resource limits for unifying a list of entities."""
+
+    def __init__(self, max_list_length=None, max_comparisons=None,
+                 time_budget=None, fallback=UnifierFallbackOps.RAISE):
+        """
+        Args:
+            max_list_length: Maximum length of any of the root, head and
+                update lists.
+
+            max_comparisons: Maximum number of comparator evaluations needed
+                in the worst case for matching the three lists with each
+                other.
+
+            time_budget: Maximum number of seconds spent on matching the
+                entities of the lists.
+
+            fallback
+              (:class:`json_merger.config.UnifierFallbackOps` class attribute):
+                Strategy used when one of the limits is exceeded.
+        """
+        if fallback not in UnifierFallbackOps.allowed_ops:
+            raise ValueError('Fallback %r not permitted' % fallback)
+
+        self.max_list_length = max_list_length
+        self.max_comparisons = max_comparisons
+        self.time_budget = time_budget
+        self.fallback = fallback
+
+    def check_lists(self, root, head, update):
+        """Returns the reason for which the lists exceed the limits or None.
+
+        This check is done before any comparison takes place.
+        """
+        if self.max_list_length is not None:
+            length = max(len(root), len(head), len(update))
+            if length > self.max_list_length:
+                return 'List length %s exceeds %s' % (length,
+                                                      self.max_list_length)
+        if self.max_comparisons is not None:
+            comparisons = (len(root) * len(head) + len(root) * len(update) +
+                           len(head) * len(update))
+            if comparisons > self.max_comparisons:
+                return 'Comparisons %s exceed %s' % (
+                    comparisons, self.max_comparisons)
+        return None
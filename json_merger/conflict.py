@@ -26,9 +26,16 @@ from __future__ import absolute_import, print_function
 
 import json
 
+import six
 from pyrsistent import freeze, thaw
 
-from .utils import force_list
+from .errors import MergeAbortedError
+from .utils import KeyPath, force_list
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class ConflictType(object):
@@ -79,7 +86,9 @@ class Conflict(tuple):
     Note:
         Even if the conflict body can be any arbitrary object, this is saved
         internally as an immutable object so that a Conflict instance can be
-        safely used in sets or as a dict key.
+        safely used in sets or as a dict key. Every access to ``body``
+        returns a new mutable copy of it. Use ``frozen_body`` for a
+        read-only view without any copy.
     """
 
     # Based on http://stackoverflow.com/a/4828108
@@ -88,16 +97,24 @@ class Conflict(tuple):
     def __new__(cls, conflict_type, path, body):
         if conflict_type not in _CONFLICTS:
             raise ValueError('Bad Conflict Type %s' % conflict_type)
-        body = freeze(body)
-        return tuple.__new__(cls, (conflict_type, path, body))
+        return cls._from_frozen(conflict_type, path, freeze(body))
+
+    @classmethod
+    def _from_frozen(cls, conflict_type, path, frozen_body):
+        return tuple.__new__(cls, (conflict_type, path, frozen_body))
 
     conflict_type = property(lambda self: self[0])
     path = property(lambda self: self[1])
+    frozen_body = property(lambda self: self[2])
+
     body = property(lambda self: thaw(self[2]))
 
     def with_prefix(self, root_path):
         """Returns a new conflict with a prepended prefix as a path."""
-        return Conflict(self.conflict_type, root_path + self.path, self.body)
+        if not root_path:
+            return self
+        return self._from_frozen(self.conflict_type, root_path + self.path,
+                                 self.frozen_body)
 
     def to_json(self):
         """Deserializes conflict to a JSON object.
@@ -110,6 +127,9 @@ class Conflict(tuple):
         - Path becomes `json-pointer <https://tools.ietf.org/html/rfc6901>`_
         - Original conflict type is added to "$type"
         """
+        return json.dumps(self._json_patch_ops())
+
+    def _json_patch_ops(self, pointers=None):
         # map ConflictType to json-patch operator
         path = self.path
         if self.conflict_type in ('REORDER', 'SET_FIELD'):
@@ -124,11 +144,15 @@ class Conflict(tuple):
         else:
             raise ValueError(
                 'Conflict Type %s can not be mapped to a json-patch operation'
-                % conflict_type
+                % self.conflict_type
             )
 
-        # stringify path array
-        json_pointer = '/' + '/'.join(str(el) for el in path)
+        if pointers is None:
+            json_pointer = _to_json_pointer(path)
+        else:
+            json_pointer = pointers.get(path)
+            if json_pointer is None:
+                json_pointer = pointers[path] = _to_json_pointer(path)
 
         conflict_values = force_list(self.body)
         conflicts = []
@@ -141,4 +165,121 @@ class Conflict(tuple):
                     '$type': self.conflict_type
                 })
 
-        return json.dumps(conflicts)
+        return conflicts
+
+
+class ConflictSink(object):
+    """Accumulator for the conflicts found during a merge.
+
+    The merging components add their conflicts relative to the path of the
+    object they are merging, and the sink stores them with absolute paths
+    in a list shared by all the sinks obtained through :meth:`at`.
+
+    Attributes:
+        conflicts: The shared list of conflicts.
+
+        path: A :class:`json_merger.utils.KeyPath` prefixed to the paths of
+            the added conflicts.
+
+        fail_fast_on: Set of :class:`json_merger.conflict.ConflictType`
+            members. Adding a conflict of one of these types raises
+            :class:`json_merger.errors.MergeAbortedError`.
+    """
+
+    __slots__ = ('conflicts', 'path', 'fail_fast_on')
+
+    def __init__(self, conflicts=None, path=None, fail_fast_on=None):
+        self.conflicts = [] if conflicts is None else conflicts
+        if not isinstance(path, KeyPath):
+            path = KeyPath().extend(path or ())
+        self.path = path
+        self.fail_fast_on = fail_fast_on
+
+    def at(self, keys):
+        """Returns a sink sharing the conflicts, relative to ``keys``."""
+        return ConflictSink(self.conflicts, self.path.extend(keys),
+                            self.fail_fast_on)
+
+    def add(self, conflict):
+        self.extend((conflict, ))
+
+    def extend(self, conflicts):
+        prefix = self.path.tuple
+        start = len(self.conflicts)
+        self.conflicts.extend(c.with_prefix(prefix) for c in conflicts)
+        if not self.fail_fast_on:
+            return
+        for conflict in self.conflicts[start:]:
+            if conflict.conflict_type in self.fail_fast_on:
+                raise MergeAbortedError(
+                    'Merge aborted on %s conflict at %r' % (
+                        conflict.conflict_type, conflict.path),
+                    self.conflicts, conflict.path)
+
+    def __len__(self):
+        return len(self.conflicts)
+
+
+class NullConflictSink(ConflictSink):
+    """Conflict sink discarding all the conflicts added to it."""
+
+    __slots__ = ()
+
+    def at(self, keys):
+        return self
+
+    def extend(self, conflicts):
+        pass
+
+
+def _to_json_pointer(path):
+    return '/' + '/'.join(six.text_type(el).replace('~', '~0')
+                          .replace('/', '~1') for el in path)
+
+
+def _default_dumps(obj):
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj)
+
+
+def conflicts_to_json_patch(conflicts, stream=None, dumps=None):
+    """Serialize a list of conflicts as a single json-patch document.
+
+    Each conflict is mapped to operations as in
+    :meth:`json_merger.conflict.Conflict.to_json`. The json-pointer of a
+    path is computed only once for all the conflicts sharing it.
+
+    Args:
+        conflicts: An iterable of :class:`json_merger.conflict.Conflict`.
+
+        stream: Optional text file-like object. If given, the document is
+            written to it one operation at a time instead of being returned.
+
+        dumps: Optional callable serializing one operation to a string,
+            used when writing to ``stream``. Defaults to ``orjson`` when it
+            is installed and to :func:`json.dumps` otherwise.
+
+    Returns:
+        The list of json-patch operations, or ``None`` if ``stream`` is
+        given.
+    """
+    pointers = {}
+    if stream is None:
+        patch = []
+        for conflict in conflicts:
+            patch.extend(conflict._json_patch_ops(pointers))
+        return patch
+
+    dumps = dumps or _default_dumps
+    separator = u'['
+    for conflict in conflicts:
+        for op in conflict._json_patch_ops(pointers):
+            stream.write(separator)
+            stream.write(dumps(op))
+            separator = u', '
+    stream.write(u']' if separator != u'[' else u'[]')
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Solvers for the linear assignment problem.
+
+All the solvers receive a rectangular cost matrix given as a list of rows
+and return the ``(row, column)`` pairs of a minimum cost assignment sorted
+by row, like :meth:`munkres.Munkres.compute`.
+"""
+
+from __future__ import absolute_import, print_function
+
+from munkres import Munkres
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Minimum number of matrix cells from which the shortest augmenting path
+# solver is used instead of Munkres.
+SMALL_MATRIX_SIZE = 25
+
+# Minimum number of matrix cells from which the NumPy version of the
+# shortest augmenting path solver is used, if NumPy is installed.
+NUMPY_MIN_SIZE = 40000
+
+
+def munkres_assignment(cost_matrix):
+    """Solve the assignment using the pure Python Munkres algorithm."""
+    if not cost_matrix or not cost_matrix[0]:
+        return []
+    return Munkres().compute(cost_matrix)
+
+
+def jv_assignment(cost_matrix, use_numpy=None):
+    """Solve the assignment using a shortest augmenting path algorithm.
+
+    This is the Jonker-Volgenant approach without the initialization
+    heuristics, as described by D. F. Crouse in "On implementing 2D
+    rectangular assignment algorithms" (2016). It runs in O(n^2 m) for a
+    n x m matrix with n <= m.
+
+    Args:
+        cost_matrix: List of rows of costs.
+
+        use_numpy: Whether to use the NumPy implementation. By default it is
+            used for matrices of at least ``NUMPY_MIN_SIZE`` cells when
+            NumPy is installed.
+    """
+    if not cost_matrix or not cost_matrix[0]:
+        return []
+
+    transposed = len(cost_matrix) > len(cost_matrix[0])
+    if transposed:
+        cost_matrix = [list(col) for col in zip(*cost_matrix)]
+
+    if use_numpy is None:
+        use_numpy = (numpy is not None and
+                     len(cost_matrix) * len(cost_matrix[0]) >= NUMPY_MIN_SIZE)
+    if use_numpy:
+        col4row = _shortest_augmenting_path_numpy(cost_matrix)
+    else:
+        col4row = _shortest_augmenting_path(cost_matrix)
+
+    if transposed:
+        return sorted((col, row) for row, col in enumerate(col4row))
+    return list(enumerate(col4row))
+
+
+def linear_assignment(cost_matrix):
+    """Solve the assignment with the fastest solver for the matrix size.
+
+    Small matrices keep the results of :func:`munkres_assignment`, including
+    how it breaks ties. Those with a single row, and those with a single
+    column or of size 2 x 2 having a unique optimum, are solved inline. The
+    others below ``SMALL_MATRIX_SIZE`` cells are solved by Munkres. Larger
+    matrices are solved by :func:`jv_assignment`.
+    """
+    if not cost_matrix or not cost_matrix[0]:
+        return []
+
+    rows = len(cost_matrix)
+    cols = len(cost_matrix[0])
+    if rows == 1:
+        row = cost_matrix[0]
+        return [(0, row.index(min(row)))]
+    if cols == 1:
+        col = [row[0] for row in cost_matrix]
+        lowest = min(col)
+        if col.count(lowest) == 1:
+            return [(col.index(lowest), 0)]
+    elif rows == cols == 2:
+        (c00, c01), (c10, c11) = cost_matrix
+        if c00 + c11 < c01 + c10:
+            return [(0, 0), (1, 1)]
+        if c00 + c11 > c01 + c10:
+            return [(0, 1), (1, 0)]
+    if rows * cols < SMALL_MATRIX_SIZE:
+        return munkres_assignment(cost_matrix)
+    return jv_assignment(cost_matrix)
+
+
+def _shortest_augmenting_path(cost_matrix):
+    n_rows = len(cost_matrix)
+    n_cols = len(cost_matrix[0])
+    inf = float('inf')
+
+    u = [0.0] * n_rows
+    v = [0.0] * n_cols
+    col4row = [-1] * n_rows
+    row4col = [-1] * n_cols
+
+    for cur_row in range(n_rows):
+        shortest = [inf] * n_cols
+        path = [-1] * n_cols
+        visited_rows = []
+        visited_cols = []
+        remaining = list(range(n_cols - 1, -1, -1))
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+
+        while sink == -1:
+            visited_rows.append(i)
+            row = cost_matrix[i]
+            u_i = u[i]
+            index = -1
+            lowest = inf
+            for it, j in enumerate(remaining):
+                r = min_val + row[j] - u_i - v[j]
+                if r < shortest[j]:
+                    path[j] = i
+                    shortest[j] = r
+                # Prefer the free columns on ties, to end the search early.
+                if (shortest[j] < lowest or
+                        (shortest[j] == lowest and row4col[j] == -1)):
+                    lowest = shortest[j]
+                    index = it
+
+            min_val = lowest
+            if min_val == inf:
+                raise ValueError('Cost matrix is infeasible')
+            j = remaining[index]
+            if row4col[j] == -1:
+                sink = j
+            else:
+                i = row4col[j]
+            visited_cols.append(j)
+            remaining[index] = remaining[-1]
+            remaining.pop()
+
+        # Update the dual variables.
+        u[cur_row] += min_val
+        for i in visited_rows[1:]:
+            u[i] += min_val - shortest[col4row[i]]
+        for j in visited_cols:
+            v[j] -= min_val - shortest[j]
+
+        # Augment the assignment along the found path.
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+
+    return col4row
+
+
+def _shortest_augmenting_path_numpy(cost_matrix):
+    cost = numpy.asarray(cost_matrix, dtype=float)
+    n_rows, n_cols = cost.shape
+
+    u = numpy.zeros(n_rows)
+    v = numpy.zeros(n_cols)
+    col4row = numpy.full(n_rows, -1, dtype=int)
+    row4col = numpy.full(n_cols, -1, dtype=int)
+
+    for cur_row in range(n_rows):
+        shortest = numpy.full(n_cols, numpy.inf)
+        path = numpy.full(n_cols, -1, dtype=int)
+        visited_rows = []
+        visited_cols = []
+        remaining = numpy.arange(n_cols - 1, -1, -1)
+        min_val = 0.0
+        i = cur_row
+        sink = -1
+
+        while sink == -1:
+            visited_rows.append(i)
+            r = min_val + cost[i, remaining] - u[i] - v[remaining]
+            improved = r < shortest[remaining]
+            path[remaining[improved]] = i
+            shortest[remaining] = numpy.minimum(shortest[remaining], r)
+
+            candidates = shortest[remaining]
+            lowest = candidates.min()
+            if lowest == numpy.inf:
+                raise ValueError('Cost matrix is infeasible')
+            # Same tie breaking as the pure Python version: the last free
+            # column among the ties, or the first tie if none is free.
+            ties = numpy.flatnonzero(candidates == lowest)
+            free_ties = ties[row4col[remaining[ties]] == -1]
+            index = free_ties[-1] if len(free_ties) else ties[0]
+
+            min_val = lowest
+            j = remaining[index]
+            if row4col[j] == -1:
+                sink = j
+            else:
+                i = row4col[j]
+            visited_cols.append(j)
+            remaining[index] = remaining[-1]
+            remaining = remaining[:-1]
+
+        u[cur_row] += min_val
+        for i in visited_rows[1:]:
+            u[i] += min_val - shortest[col4row[i]]
+        visited_cols = numpy.array(visited_cols)
+        v[visited_cols] -= min_val - shortest[visited_cols]
+
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == cur_row:
+                break
+
+    return [int(col) for col in col4row]
@@ -25,18 +25,102 @@
 from __future__ import absolute_import, print_function
 
 import re
+import threading
+from collections import OrderedDict
 
-import editdistance
-import six
-
-from munkres import Munkres
-from unidecode import unidecode
+from .assignment import linear_assignment
+from .text_util import (
+    decode_if_not_unicode, normalized_edit_dist, unicode_to_ascii
+)
 
 _RE_NAME_TOKEN_SEPARATOR = re.compile(r'[^\w\'-]+', re.UNICODE)
 
 
-def _normalized_edit_dist(s1, s2):
-    return float(editdistance.eval(s1, s2)) / max(len(s1), len(s2), 1)
+class LRUCache(object):
+    """Thread safe cache keeping the most recently used values.
+
+    Attributes:
+        maxsize: Maximum number of cached values.
+
+        hits, misses: Number of lookups that found or missed their key.
+    """
+
+    def __init__(self, maxsize=16384):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Return the value of ``key``, calling ``compute(key)`` if missing.
+
+        The value is computed outside of the lock, so two threads missing
+        the same key may both compute it.
+        """
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+            else:
+                self._data[key] = value
+                self.hits += 1
+                return value
+
+        value = compute(key)
+        with self._lock:
+            self._data[key] = value
+            self._evict()
+        return value
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Tokenized and normalized forms of the author names, shared by all the
+# normalizers and distance calculators.
+NAME_CACHE = LRUCache()
+
+
+def _tokenize_name(key):
+    tokenize_function, asciify, name = key
+    if asciify:
+        name = unicode_to_ascii(name)
+    return tokenize_function(name)
+
+
+def tokenize_name(name, tokenize_function, asciify=False, cache=NAME_CACHE):
+    """Tokenize an author name, reusing the cached tokens if possible.
+
+    Args:
+        name: The author name.
+        tokenize_function: The tokenizer to use, e.g. simple_tokenize.
+        asciify: Whether to asciify the name before tokenizing it.
+        cache: The :class:`LRUCache` to use, or None to disable caching.
+
+    Returns:
+        The tokens returned by the tokenizer, which must not be modified.
+    """
+    key = (tokenize_function, asciify, decode_if_not_unicode(name))
+    if cache is None:
+        return _tokenize_name(key)
+    return cache.get(key, _tokenize_name)
 
 
 class NameToken(object):
@@ -56,15 +140,19 @@ class NameInitial(NameToken):
         return self.token == other.token[:len(self.token)]
 
 
-def token_distance(t1, t2, initial_match_penalization):
-    """Calculates the edit distance between two tokens."""
+def token_distance(t1, t2, initial_match_penalization, max_distance=None):
+    """Calculates the edit distance between two tokens.
+
+    If ``max_distance`` is given, the distances greater than it are not
+    computed exactly and 1.0 is returned instead.
+    """
     if isinstance(t1, NameInitial) or isinstance(t2, NameInitial):
         if t1.token == t2.token:
             return 0
         if t1 == t2:
             return initial_match_penalization
         return 1.0
-    return _normalized_edit_dist(t1.token, t2.token)
+    return normalized_edit_dist(t1.token, t2.token, max_distance)
 
 
 def simple_tokenize(name):
@@ -87,7 +175,7 @@ class AuthorNameNormalizer(object):
     def __init__(self, tokenize_function,
                  first_names_number=None,
                  first_name_to_initial=False,
-                 asciify=False):
+                 asciify=False, cache=NAME_CACHE):
         """Initialize the normalizer.
 
         Args:
@@ -105,18 +193,30 @@ class AuthorNameNormalizer(object):
             asciify:
                 If set to True, all non-ASCII characters will be replaced by
                 the closest ASCII character, e.g. 'é' -> 'e'.
+            cache:
+                The :class:`LRUCache` keeping the tokenized and normalized
+                names, or None to disable caching.
         """
 
         self.tokenize_function = tokenize_function
         self.first_names_number = first_names_number
         self.first_name_to_initial = first_name_to_initial
-        self.normalize_chars = lambda x: _asciify(x) if asciify else x
+        self.asciify = asciify
+        self.normalize_chars = lambda x: unicode_to_ascii(x) if asciify else x
+        self.cache = cache
 
     def __call__(self, author):
-        name = author.get('full_name', '')
-        name = _decode_if_not_unicode(name)
-        name = self.normalize_chars(name)
-        tokens = self.tokenize_function(name)
+        name = decode_if_not_unicode(author.get('full_name', ''))
+        if self.cache is None:
+            return self._normalize(name)
+        key = (AuthorNameNormalizer, self.tokenize_function,
+               self.first_names_number, self.first_name_to_initial,
+               self.asciify, name)
+        return self.cache.get(key, lambda key: self._normalize(name))
+
+    def _normalize(self, name):
+        tokens = tokenize_name(name, self.tokenize_function, self.asciify,
+                               self.cache)
         last_fn_char = 1 if self.first_name_to_initial else None
         last_fn_idx = self.first_names_number
 
@@ -128,8 +228,12 @@ class AuthorNameNormalizer(object):
 class AuthorNameDistanceCalculator(object):
     """Callable that calculates a distance between two author's names."""
 
+    # The distance methods accept a ``max_distance`` argument.
+    accepts_max_distance = True
+
     def __init__(self, tokenize_function, match_on_initial_penalization=0.05,
-                 full_name_field='full_name'):
+                 full_name_field='full_name', cache=NAME_CACHE,
+                 assignment_fn=linear_assignment):
         """Initialize the distance calculator.
 
         Args:
@@ -142,6 +246,13 @@ class AuthorNameDistanceCalculator(object):
                 starting with the same letter.
             name_field:
                 The field in which an author record keeps the full name.
+            cache:
+                The :class:`LRUCache` keeping the tokenized names, or None
+                to disable caching.
+            assignment_fn:
+                The solver from
+                :mod:`json_merger.contrib.inspirehep.assignment` used to
+                match the name tokens.
         Note:
             The default match_on_initial_penalization had the best results
             on a test suite based on production data.
@@ -149,36 +260,65 @@ class AuthorNameDistanceCalculator(object):
         self.tokenize_function = tokenize_function
         self.match_on_initial_penalization = match_on_initial_penalization
         self.name_field = full_name_field
+        self.cache = cache
+        self.assignment_fn = assignment_fn
+
+    def __call__(self, author1, author2, max_distance=None):
+        return self.distance(self.get_features(author1),
+                             self.get_features(author2), max_distance)
+
+    def get_features(self, author):
+        """Precompute the features of an author used by :meth:`distance`.
+
+        Returns:
+            A tuple of the asciified name tokens, last names first, and of
+            the flags telling which tokens are initials, or None if the
+            author has no name.
+        """
+        if self.name_field not in author:
+            return None
+
+        tokens = tokenize_name(author[self.name_field],
+                               self.tokenize_function, True, self.cache)
+        tokens = tuple(tokens['lastnames'] + tokens['nonlastnames'])
+        return tokens, tuple(isinstance(t, NameInitial) for t in tokens)
 
-    def __call__(self, author1, author2):
+    def distance(self, features1, features2, max_distance=None):
+        """Calculate the distance between two precomputed author features.
+
+        Args:
+            features1, features2: Features returned by :meth:`get_features`.
+            max_distance: Optional bound of the distances of interest. The
+                result is exact when it is not greater than the bound, and
+                greater than the bound otherwise, but it may be computed
+                faster.
+        """
         # Return 1.0 on missing features.
-        if self.name_field not in author1:
-            return 1.0
-        if self.name_field not in author2:
+        if features1 is None or features2 is None:
             return 1.0
 
-        # Normalize to unicode
-        name_a1 = _asciify(_decode_if_not_unicode(author1[self.name_field]))
-        name_a2 = _asciify(_decode_if_not_unicode(author2[self.name_field]))
+        tokens_a1, initials_a1 = features1
+        tokens_a2, initials_a2 = features2
 
-        tokens_a1 = self.tokenize_function(name_a1)
-        tokens_a2 = self.tokenize_function(name_a2)
-        tokens_a1 = tokens_a1['lastnames'] + tokens_a1['nonlastnames']
-        tokens_a2 = tokens_a2['lastnames'] + tokens_a2['nonlastnames']
+        # A single token pair farther than this makes the total distance
+        # greater than max_distance, so its exact value is not needed.
+        token_max_distance = None
+        if max_distance is not None:
+            token_max_distance = max_distance * max(
+                min(len(tokens_a1), len(tokens_a2)), 1.0)
 
         # Match all names by editdistance.
         dist_matrix = [
-            [token_distance(t1, t2, self.match_on_initial_penalization)
+            [token_distance(t1, t2, self.match_on_initial_penalization,
+                            token_max_distance)
              for t2 in tokens_a2] for t1 in tokens_a1]
 
-        matcher = Munkres()
-        indices = matcher.compute(dist_matrix)
+        indices = self.assignment_fn(dist_matrix)
         cost = 0.0
         matched_only_initials = True
         for idx_a1, idx_a2 in indices:
             cost += dist_matrix[idx_a1][idx_a2]
-            if (not isinstance(tokens_a1[idx_a1], NameInitial) or
-                    not isinstance(tokens_a2[idx_a2], NameInitial)):
+            if not initials_a1[idx_a1] or not initials_a2[idx_a2]:
                 matched_only_initials = False
 
         # Johnny, D will not be equal with Donny, J
@@ -188,14 +328,91 @@ class AuthorNameDistanceCalculator(object):
         return cost / max(min(len(tokens_a1), len(tokens_a2)), 1.0)
 
 
-def _decode_if_not_unicode(value):
-    to_return = value
+class AuthorNameIndex(object):
+    """Inverted index from last name tokens to author positions."""
 
-    if not isinstance(value, six.text_type):
-        to_return = value.decode('utf-8')
+    def __init__(self, authors, tokenize_function, use_initials=False,
+                 full_name_field='full_name', cache=NAME_CACHE):
+        """Index a list of authors.
 
-    return to_return
-
-
-def _asciify(value):
-    return six.text_type(unidecode(value))
+        Args:
+            authors: The list of authors to index.
+            tokenize_function: The tokenizer used for the author names,
+                e.g. simple_tokenize.
+            use_initials: If set to True, an author is only found by the
+                authors sharing a last name token and a first name initial.
+                The authors without first names are found by all the
+                authors sharing a last name token.
+            full_name_field: The field in which an author record keeps the
+                full name.
+            cache: The :class:`LRUCache` keeping the tokenized names, or
+                None to disable caching.
+        """
+        self.tokenize_function = tokenize_function
+        self.use_initials = use_initials
+        self.name_field = full_name_field
+        self.cache = cache
+        self._by_last_name = {}
+        self._by_last_name_initial = {}
+        for position, author in enumerate(authors):
+            last_names, initials = self._get_keys(author)
+            for last_name in last_names:
+                self._by_last_name.setdefault(last_name, []).append(position)
+                if not self.use_initials:
+                    continue
+                for initial in initials or (None, ):
+                    self._by_last_name_initial.setdefault(
+                        (last_name, initial), []).append(position)
+
+    def get(self, author):
+        """Return the sorted positions of the authors which may match."""
+        last_names, initials = self._get_keys(author)
+        positions = set()
+        for last_name in last_names:
+            if not self.use_initials or not initials:
+                positions.update(self._by_last_name.get(last_name, ()))
+                continue
+            for initial in initials + (None, ):
+                positions.update(self._by_last_name_initial.get(
+                    (last_name, initial), ()))
+        return sorted(positions)
+
+    def _get_keys(self, author):
+        if self.name_field not in author:
+            return (), ()
+        tokens = tokenize_name(author[self.name_field],
+                               self.tokenize_function, True, self.cache)
+        last_names = set(t.token for t in tokens['lastnames'])
+        initials = tuple(sorted(set(t.token[:1]
+                                    for t in tokens['nonlastnames'])))
+        return last_names, initials
+
+
+class AuthorNameCandidates(object):
+    """Callable yielding the authors of two lists which may match.
+
+    Instances can be used as ``candidates_function`` of a
+    ``DistanceFunctionComparator``. Only the authors sharing a last name
+    token, and optionally a first name initial, are compared, so the authors
+    whose last names are misspelled or permuted with the first names are
+    never matched.
+    """
+
+    def __init__(self, tokenize_function, use_initials=False,
+                 full_name_field='full_name', cache=NAME_CACHE):
+        """Initialize the candidate generator.
+
+        See :class:`AuthorNameIndex` for the arguments.
+        """
+        self.tokenize_function = tokenize_function
+        self.use_initials = use_initials
+        self.name_field = full_name_field
+        self.cache = cache
+
+    def __call__(self, authors1, authors2):
+        index = AuthorNameIndex(authors2, self.tokenize_function,
+                                self.use_initials, self.name_field,
+                                self.cache)
+        for idx_a1, author in enumerate(authors1):
+            for idx_a2 in index.get(author):
+                yield idx_a1, idx_a2
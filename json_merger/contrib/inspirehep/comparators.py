@@ -24,23 +24,95 @@
 
 from __future__ import absolute_import, print_function
 
+import functools
+
+from pyrsistent import freeze
+
 from json_merger.comparator import BaseComparator
+from json_merger.nothing import NOTHING
+from json_merger.utils import get_obj_at_key_path
 
-from .match import distance_function_match
+from .match import blocking_candidates, distance_function_match
+from .reference_util import (
+    ReferenceTitleDistanceCalculator, get_reference_identifiers,
+    get_title_words
+)
 
 
 class DistanceFunctionComparator(BaseComparator):
     norm_functions = []
     distance_function = None
     threshold = 0.0
+    # Optional function yielding the pairs of indices of the elements that
+    # may match, see :func:`.match.distance_function_match`.
+    candidates_function = None
+    # Key paths of the identifiers of the elements, e.g. 'record.$ref'. The
+    # elements sharing an identifier are matched before the others.
+    identifier_fields = []
 
     def process_lists(self):
         if self.distance_function is None:
             raise NotImplementedError('You need to provide a distance '
                                       'function')
         # Get the unbound version of the distance function.
-        dist_fn = self.__class__.__dict__['distance_function']
-        self.matches = set(distance_function_match(self.l1, self.l2,
-                                                   self.threshold,
-                                                   dist_fn,
-                                                   self.norm_functions))
+        dist_fn = self._get_class_attribute('distance_function')
+        bounded = getattr(dist_fn, 'accepts_max_distance', False)
+        # Distance functions able to precompute the features of an element
+        # get them only once per element instead of once per pair.
+        feature_fn = getattr(dist_fn, 'get_features', None)
+        if feature_fn is not None:
+            dist_fn = dist_fn.distance
+        # Only the distances up to the threshold need to be exact to find
+        # the pairs which may match.
+        bounded_dist_fn = None
+        if bounded:
+            bounded_dist_fn = functools.partial(dist_fn,
+                                                max_distance=self.threshold)
+        candidates_fn = self._get_class_attribute('candidates_function')
+        identifier_fn = None
+        if self.identifier_fields:
+            identifier_fn = self._get_identifiers
+        self.matches = set(distance_function_match(
+            self.l1, self.l2, self.threshold, dist_fn, self.norm_functions,
+            feature_fn, candidates_fn=candidates_fn,
+            identifier_fn=identifier_fn, deadline=self.deadline,
+            bounded_dist_fn=bounded_dist_fn))
+
+    def _get_identifiers(self, obj):
+        # Every value of a list field is an identifier, e.g. every entry of
+        # 'ids'.
+        identifiers = []
+        for field in self.identifier_fields:
+            key_path = tuple(k for k in field.split('.') if k)
+            value = get_obj_at_key_path(obj, key_path, NOTHING)
+            if value is NOTHING or value is None:
+                continue
+            values = value if isinstance(value, list) else [value]
+            identifiers.extend((field, freeze(v)) for v in values)
+        return identifiers
+
+    @classmethod
+    def _get_class_attribute(cls, name):
+        # Get functions set as class attributes without binding them.
+        for klass in cls.__mro__:
+            if name in klass.__dict__:
+                return klass.__dict__[name]
+
+
+class ReferenceComparator(DistanceFunctionComparator):
+    """Matches INSPIRE references by identifiers, then by title.
+
+    The references sharing a record reference, a DOI, an arXiv eprint or a
+    pubnote are joined through their identifiers. The remaining ones are
+    compared by their normalized titles, only with the references sharing a
+    title word.
+    """
+
+    distance_function = ReferenceTitleDistanceCalculator()
+    threshold = 0.1
+    candidates_function = blocking_candidates(get_title_words)
+    identifier_fields = ['record.$ref']
+
+    def _get_identifiers(self, obj):
+        return (super(ReferenceComparator, self)._get_identifiers(obj) +
+                get_reference_identifiers(obj))
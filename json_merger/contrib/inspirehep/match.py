@@ -24,17 +24,85 @@
 
 from __future__ import absolute_import, print_function
 
-from munkres import Munkres
-
-
-def distance_function_match(l1, l2, thresh, dist_fn, norm_funcs=[]):
-    """Returns pairs of matching indices from l1 and l2."""
+import time
+
+from json_merger.errors import TimeBudgetExceededError
+
+from .assignment import linear_assignment
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Minimum number of matrix cells from which the equal distance matches are
+# searched with NumPy, if it is installed.
+NUMPY_TIES_MIN_SIZE = 400
+
+
+def distance_function_match(l1, l2, thresh, dist_fn, norm_funcs=[],
+                            feature_fn=None, assignment_fn=linear_assignment,
+                            candidates_fn=None, identifier_fn=None,
+                            deadline=None, bounded_dist_fn=None):
+    """Returns pairs of matching indices from l1 and l2.
+
+    If ``identifier_fn`` is given, it receives an element and returns an
+    iterable of its hashable identifiers. The elements sharing an identifier
+    with exactly one element of the other list, and the other way around,
+    are matched first, whatever their distance, see
+    :func:`_match_by_identifiers`.
+
+    If ``feature_fn`` is given, it is called once for every element and
+    ``dist_fn`` receives the features of two elements instead of the
+    elements themselves.
+
+    If ``bounded_dist_fn`` is given, it is used instead of ``dist_fn`` where
+    only the distances up to ``thresh`` matter. It must return the exact
+    distance when it is not greater than ``thresh``, and any value greater
+    than ``thresh`` otherwise. The distance matrices given to the assignment
+    solver still hold the exact distances.
+
+    The remaining elements are matched by minimizing their total distance
+    with ``assignment_fn``, one of the solvers from
+    :mod:`json_merger.contrib.inspirehep.assignment`. By default, the distance
+    is computed between all of them. If ``candidates_fn`` is given, it
+    receives the two lists of remaining elements and yields the pairs of
+    indices which may match, e.g. :func:`blocking_candidates`. Only their
+    distance is computed and the other pairs are never matched.
+
+    If ``deadline`` is given, TimeBudgetExceededError is raised when the
+    wall-clock time passes it while computing the distances.
+    """
     common = []
+    # Compute the distance between elements by their global index.
+    if feature_fn is not None:
+        values1 = [feature_fn(e) for e in l1]
+        values2 = [feature_fn(e) for e in l2]
+    else:
+        values1 = l1
+        values2 = l2
+
+    def idx_dist_fn(i1, i2):
+        return dist_fn(values1[i1], values2[i2])
+
+    if bounded_dist_fn is None:
+        idx_bounded_dist_fn = idx_dist_fn
+    else:
+        def idx_bounded_dist_fn(i1, i2):
+            return bounded_dist_fn(values1[i1], values2[i2])
+
     # We will keep track of the global index in the source list as we
     # will successively reduce their sizes.
     l1 = list(enumerate(l1))
     l2 = list(enumerate(l2))
 
+    # Match the elements sharing unambiguous identifiers and leave only the
+    # others to the next stages.
+    if identifier_fn is not None:
+        new_common, l1, l2 = _match_by_identifiers(
+                l1, l2, lambda a: identifier_fn(a[1]))
+        common.extend((c1[0], c2[0]) for c1, c2 in new_common)
+
     # Use the distance function and threshold on hints given by normalization.
     # See _match_by_norm_func for implementation details.
     # Also wrap the list element function function to ignore the global list
@@ -43,39 +111,165 @@ def distance_function_match(l1, l2, thresh, dist_fn, norm_funcs=[]):
         new_common, l1, l2 = _match_by_norm_func(
                 l1, l2,
                 lambda a: norm_fn(a[1]),
-                lambda a1, a2: dist_fn(a1[1], a2[1]),
+                lambda a1, a2: idx_bounded_dist_fn(a1[0], a2[0]),
                 thresh)
         # Keep only the global list index in the end result.
         common.extend((c1[0], c2[0]) for c1, c2 in new_common)
 
-    # Take any remaining umatched entries and try to match them using the
-    # Munkres algorithm.
-    dist_matrix = [[dist_fn(e1, e2) for i2, e2 in l2] for i1, e1 in l1]
-
-    # Call Munkres on connected components on the remaining bipartite graph.
+    # Take any remaining umatched entries and try to match them by solving
+    # the linear assignment problem.
+    if candidates_fn is None:
+        dist_matrix = []
+        for i1, e1 in l1:
+            _check_deadline(deadline)
+            dist_matrix.append([idx_bounded_dist_fn(i1, i2)
+                                for i2, e2 in l2])
+        distances = ((l1_i, l2_i, dist_matrix[l1_i][l2_i])
+                     for l1_i in range(len(l1)) for l2_i in range(len(l2)))
+
+        def get_distance(l1_i, l2_i):
+            dst = dist_matrix[l1_i][l2_i]
+            if dst > thresh and bounded_dist_fn is not None:
+                dst = idx_dist_fn(l1[l1_i][0], l2[l2_i][0])
+            return dst
+    else:
+        # Only compute the distances of the candidate pairs. The others are
+        # considered farther than the threshold.
+        sparse_distances = {}
+        last_l1_i = None
+        for l1_i, l2_i in candidates_fn([e for _, e in l1],
+                                        [e for _, e in l2]):
+            if l1_i != last_l1_i:
+                _check_deadline(deadline)
+                last_l1_i = l1_i
+            if (l1_i, l2_i) not in sparse_distances:
+                sparse_distances[l1_i, l2_i] = idx_bounded_dist_fn(
+                    l1[l1_i][0], l2[l2_i][0])
+        distances = ((l1_i, l2_i, dst)
+                     for (l1_i, l2_i), dst in sparse_distances.items())
+        missing_distance = abs(thresh) + 1.0
+
+        def get_distance(l1_i, l2_i):
+            dst = sparse_distances.get((l1_i, l2_i))
+            if dst is None:
+                return missing_distance
+            if dst > thresh and bounded_dist_fn is not None:
+                dst = idx_dist_fn(l1[l1_i][0], l2[l2_i][0])
+            return dst
+
+    # Solve the assignment on connected components on the remaining bipartite
+    # graph. Within a component the bounded distances greater than the
+    # threshold are computed again exactly, as they change the assignment.
     # An edge links an element from l1 with an element from l2 only if
     # the distance between the elements is less (or equal) than the theshold.
-    components = BipartiteConnectedComponents()
-    for l1_i in range(len(l1)):
-        for l2_i in range(len(l2)):
-            if dist_matrix[l1_i][l2_i] > thresh:
-                continue
-            components.add_edge(l1_i, l2_i)
+    components = BipartiteConnectedComponents(len(l1), len(l2))
+    for l1_i, l2_i, dst in distances:
+        if dst > thresh:
+            continue
+        components.add_edge(l1_i, l2_i)
 
     for l1_indices, l2_indices in components.get_connected_components():
+        _check_deadline(deadline)
         # Build a partial distance matrix for each connected component.
         part_l1 = [l1[i] for i in l1_indices]
         part_l2 = [l2[i] for i in l2_indices]
 
-        part_dist_matrix = [[dist_matrix[l1_i][l2_i] for l2_i in l2_indices]
+        part_dist_matrix = [[get_distance(l1_i, l2_i) for l2_i in l2_indices]
                             for l1_i in l1_indices]
-        part_cmn = _match_munkres(part_l1, part_l2, part_dist_matrix, thresh)
+        part_cmn = _match_munkres(part_l1, part_l2, part_dist_matrix, thresh,
+                                  assignment_fn)
 
         common.extend((c1[0], c2[0]) for c1, c2 in part_cmn)
 
     return common
 
 
+def blocking_candidates(key_fn):
+    """Builds a candidate generator from a blocking key function.
+
+    Args:
+        key_fn: Function receiving an element and returning an iterable of
+            blocking keys, e.g. its name tokens.
+
+    Returns:
+        A function usable as ``candidates_fn`` in
+        :func:`distance_function_match`, which yields the pairs of indices
+        of the elements sharing at least one blocking key. It uses an
+        inverted index of the second list, so it only enumerates these pairs.
+    """
+    def candidates_fn(l1, l2):
+        index = {}
+        for l2_i, e2 in enumerate(l2):
+            for key in set(key_fn(e2)):
+                index.setdefault(key, []).append(l2_i)
+
+        for l1_i, e1 in enumerate(l1):
+            l2_indices = set()
+            for key in set(key_fn(e1)):
+                l2_indices.update(index.get(key, ()))
+            for l2_i in sorted(l2_indices):
+                yield l1_i, l2_i
+
+    return candidates_fn
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.time() > deadline:
+        raise TimeBudgetExceededError(
+            'Time budget exceeded while matching list entities.')
+
+
+def _match_by_identifiers(l1, l2, identifier_fn):
+    """Matches elements in l1 and l2 sharing identifiers.
+
+    Two elements are matched if all the elements of the other list sharing
+    an identifier with either of them are the other one, e.g.
+
+        l1 = [{'id': 1}, {'id': 2}, {'id': 3}]
+        l2 = [{'id': 1}, {'id': 2}, {'id': 2}]
+        identifier_fn = lambda x: [x['id']]
+
+    Return:
+        ([({'id': 1}, {'id': 1})], [{'id': 2}, {'id': 3}],
+         [{'id': 2}, {'id': 2}])
+    """
+    keys_l1 = [set(identifier_fn(e)) for e in l1]
+    keys_l2 = [set(identifier_fn(e)) for e in l2]
+
+    index_l1 = {}
+    for e1_idx, keys in enumerate(keys_l1):
+        for key in keys:
+            index_l1.setdefault(key, set()).add(e1_idx)
+    index_l2 = {}
+    for e2_idx, keys in enumerate(keys_l2):
+        for key in keys:
+            index_l2.setdefault(key, set()).add(e2_idx)
+
+    def matches_of(keys, index):
+        found = set()
+        for key in keys:
+            found.update(index.get(key, ()))
+        return found
+
+    common = []
+    l1_only = []
+    matched_l2_idx = set()
+    for e1_idx, e1 in enumerate(l1):
+        l2_matches = matches_of(keys_l1[e1_idx], index_l2)
+        if len(l2_matches) == 1:
+            e2_idx = l2_matches.pop()
+            if matches_of(keys_l2[e2_idx], index_l1) == {e1_idx}:
+                matched_l2_idx.add(e2_idx)
+                common.append((e1, l2[e2_idx]))
+                continue
+        l1_only.append(e1)
+
+    l2_only = [e2 for e2_idx, e2 in enumerate(l2)
+               if e2_idx not in matched_l2_idx]
+
+    return common, l1_only, l2_only
+
+
 def _match_by_norm_func(l1, l2, norm_fn, dist_fn, thresh):
     """Matches elements in l1 and l2 using normalization functions.
 
@@ -138,17 +332,28 @@ def _match_by_norm_func(l1, l2, norm_fn, dist_fn, thresh):
     return common, l1_only, l2_only
 
 
-def _match_munkres(l1, l2, dist_matrix, thresh):
-    """Matches two lists using the Munkres algorithm.
+def _match_munkres(l1, l2, dist_matrix, thresh,
+                   assignment_fn=linear_assignment):
+    """Matches two lists using a linear assignment solver.
 
     Returns pairs of matching indices from the two lists by minimizing the sum
     of the distance between the linked elements and taking only the elements
     which have the distance between them less (or equal) than the threshold.
     """
-    equal_dist_matches = set()
-    m = Munkres()
-    indices = m.compute(dist_matrix)
+    indices = assignment_fn(dist_matrix)
+
+    if (numpy is not None and
+            len(dist_matrix) * len(dist_matrix[0]) >= NUMPY_TIES_MIN_SIZE):
+        equal_dist_matches = _equal_dist_matches_numpy(dist_matrix, indices,
+                                                       thresh)
+    else:
+        equal_dist_matches = _equal_dist_matches(dist_matrix, indices, thresh)
 
+    return [(l1[l1_idx], l2[l2_idx]) for l1_idx, l2_idx in equal_dist_matches]
+
+
+def _equal_dist_matches(dist_matrix, indices, thresh):
+    equal_dist_matches = set()
     for l1_idx, l2_idx in indices:
         dst = dist_matrix[l1_idx][l2_idx]
         if dst > thresh:
@@ -160,50 +365,101 @@ def _match_munkres(l1, l2, dist_matrix, thresh):
             if abs(dst - eq_row[l2_idx]) < 1e-9:
                 equal_dist_matches.add((eq_l1_idx, l2_idx))
 
-    return [(l1[l1_idx], l2[l2_idx]) for l1_idx, l2_idx in equal_dist_matches]
+    return equal_dist_matches
+
+
+def _equal_dist_matches_numpy(dist_matrix, indices, thresh):
+    if not indices:
+        return set()
+    matrix = numpy.asarray(dist_matrix, dtype=float)
+    rows, cols = (numpy.array(idx) for idx in zip(*indices))
+    dsts = matrix[rows, cols]
+    below_thresh = dsts <= thresh
+    rows = rows[below_thresh]
+    cols = cols[below_thresh]
+    dsts = dsts[below_thresh]
+
+    # Compare all the rows, then all the columns, of the assigned pairs with
+    # their distance at once.
+    row_pos, eq_cols = numpy.nonzero(
+        numpy.abs(matrix[rows] - dsts[:, None]) < 1e-9)
+    eq_rows, col_pos = numpy.nonzero(
+        numpy.abs(matrix[:, cols] - dsts[None, :]) < 1e-9)
+
+    equal_dist_matches = set(zip(rows[row_pos].tolist(), eq_cols.tolist()))
+    equal_dist_matches.update(zip(eq_rows.tolist(), cols[col_pos].tolist()))
+    return equal_dist_matches
 
 
 class BipartiteConnectedComponents(object):
-    """Union-Find implementation for getting connected components."""
+    """Union-Find implementation for getting connected components.
 
-    def __init__(self):
-        self.parents = {}
+    The nodes of both parts are non-negative integers. They are kept in flat
+    arrays, the nodes of the first part at the even positions and the nodes
+    of the second part at the odd ones, and joined by union by rank with
+    path compression.
+    """
+
+    def __init__(self, p1_size=0, p2_size=0):
+        """
+        Args:
+            p1_size, p2_size: Expected number of nodes in each part. The
+                arrays grow if larger nodes are added.
+        """
+        size = 2 * max(p1_size, p2_size)
+        # -1 marks the positions without a node.
+        self.parents = [-1] * size
+        self.ranks = [0] * size
 
     def add_edge(self, p1_node, p2_node):
-        node_1 = (p1_node, None)
-        node_2 = (None, p2_node)
+        node_1 = self._add_node(2 * p1_node)
+        node_2 = self._add_node(2 * p2_node + 1)
         self._union(node_1, node_2)
 
     def get_connected_components(self):
-        components_by_root = _group_by_fn(self.parents.keys(),
-                                          self._find)
-        for root in components_by_root:
-            components_by_root[root].append(root)
-
-        for component in components_by_root.values():
-            p1_nodes = []
-            p2_nodes = []
-            for p1_node, p2_node in component:
-                if p1_node is None:
-                    p2_nodes.append(p2_node)
-                if p2_node is None:
-                    p1_nodes.append(p1_node)
-            yield (p1_nodes, p2_nodes)
+        """Yield the nodes of both parts in each component, in order."""
+        components = {}
+        roots = []
+        for node, parent in enumerate(self.parents):
+            if parent < 0:
+                continue
+            root = self._find(node)
+            component = components.get(root)
+            if component is None:
+                component = components[root] = ([], [])
+                roots.append(root)
+            component[node & 1].append(node >> 1)
+
+        for root in roots:
+            yield components[root]
+
+    def _add_node(self, node):
+        if node >= len(self.parents):
+            missing = max(node + 1, 2 * len(self.parents)) - len(self.parents)
+            self.parents.extend([-1] * missing)
+            self.ranks.extend([0] * missing)
+        if self.parents[node] < 0:
+            self.parents[node] = node
+        return node
 
     def _union(self, node_1, node_2):
-        parent_1 = self._find(node_1)
-        parent_2 = self._find(node_2)
-        if parent_1 != parent_2:
-            self.parents[parent_1] = parent_2
+        root_1 = self._find(node_1)
+        root_2 = self._find(node_2)
+        if root_1 == root_2:
+            return
+        if self.ranks[root_1] < self.ranks[root_2]:
+            root_1, root_2 = root_2, root_1
+        self.parents[root_2] = root_1
+        if self.ranks[root_1] == self.ranks[root_2]:
+            self.ranks[root_1] += 1
 
     def _find(self, node):
+        parents = self.parents
         root = node
-        while root in self.parents:
-            root = self.parents[root]
-        while node in self.parents:
-            prev_node = node
-            node = self.parents[node]
-            self.parents[prev_node] = root
+        while parents[root] != root:
+            root = parents[root]
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
         return root
 
 
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, print_function
+
+import re
+
+import six
+
+from .text_util import (
+    decode_if_not_unicode, normalized_edit_dist, unicode_to_ascii
+)
+
+_RE_DOI_PREFIX = re.compile(
+    r'^(doi:|https?://(dx\.)?doi\.org/)', re.IGNORECASE)
+_RE_ARXIV_PREFIX = re.compile(r'^arxiv:', re.IGNORECASE)
+_RE_ARXIV_VERSION = re.compile(r'v\d+$')
+_RE_NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+# Title words shorter than this are too common to select the references
+# worth comparing.
+MIN_TITLE_WORD_LENGTH = 4
+
+
+def normalize_doi(doi):
+    """Normalize a DOI, e.g. 'doi:10.1000/ABC' -> '10.1000/abc'."""
+    return _RE_DOI_PREFIX.sub('', doi.strip()).lower()
+
+
+def normalize_arxiv_eprint(eprint):
+    """Normalize an arXiv eprint, e.g. 'arXiv:1207.7214v2' -> '1207.7214'."""
+    eprint = _RE_ARXIV_PREFIX.sub('', eprint.strip()).lower()
+    return _RE_ARXIV_VERSION.sub('', eprint)
+
+
+def normalize_pubnote(publication_info):
+    """Normalize the journal, volume and page or article id of a reference.
+
+    Returns:
+        A tuple of the normalized journal title, volume and page or article
+        id, or None if one of them is missing.
+    """
+    journal = _normalize_text(publication_info.get('journal_title', ''))
+    volume = _normalize_text(publication_info.get('journal_volume', ''))
+    page = _normalize_text(publication_info.get('page_start') or
+                           publication_info.get('artid') or '')
+    if not (journal and volume and page):
+        return None
+    return journal, volume, page
+
+
+def get_reference_identifiers(reference):
+    """Return the normalized identifiers of an INSPIRE reference.
+
+    The identifiers are the DOIs, the arXiv eprint and the pubnote of the
+    reference, tagged by their kind.
+    """
+    identifiers = []
+    content = reference.get('reference', {})
+    for doi in content.get('dois', []):
+        identifiers.append(('doi', normalize_doi(doi)))
+    if content.get('arxiv_eprint'):
+        identifiers.append(
+            ('arxiv', normalize_arxiv_eprint(content['arxiv_eprint'])))
+    pubnote = normalize_pubnote(content.get('publication_info', {}))
+    if pubnote is not None:
+        identifiers.append(('pubnote', pubnote))
+    return identifiers
+
+
+def get_title_words(reference):
+    """Return the words of the normalized title used to block references."""
+    title = _get_normalized_title(reference)
+    if not title:
+        return []
+    return [w for w in title.split() if len(w) >= MIN_TITLE_WORD_LENGTH]
+
+
+class ReferenceTitleDistanceCalculator(object):
+    """Callable that calculates a distance between two reference titles."""
+
+    # The distance methods accept a ``max_distance`` argument.
+    accepts_max_distance = True
+
+    def __call__(self, reference1, reference2, max_distance=None):
+        return self.distance(self.get_features(reference1),
+                             self.get_features(reference2), max_distance)
+
+    def get_features(self, reference):
+        """Return the normalized title of a reference, or None if missing."""
+        return _get_normalized_title(reference) or None
+
+    def distance(self, features1, features2, max_distance=None):
+        """Return the normalized edit distance between two titles.
+
+        The result is exact when it is not greater than ``max_distance``.
+        """
+        if features1 is None or features2 is None:
+            return 1.0
+        return normalized_edit_dist(features1, features2, max_distance)
+
+
+def _get_normalized_title(reference):
+    title = reference.get('reference', {}).get('title', {})
+    if isinstance(title, dict):
+        title = title.get('title', '')
+    return ' '.join(_normalize_text(title, ' ').split())
+
+
+def _normalize_text(value, separator=''):
+    if not isinstance(value, six.string_types):
+        value = six.text_type(value)
+    value = unicode_to_ascii(decode_if_not_unicode(value)).lower()
+    return _RE_NON_ALPHANUMERIC.sub(separator, value)
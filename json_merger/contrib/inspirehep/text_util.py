@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, print_function
+
+import editdistance
+import six
+from unidecode import unidecode
+
+
+def decode_if_not_unicode(value):
+    """Decode ``value`` from UTF-8 unless it already is a unicode string."""
+    to_return = value
+
+    if not isinstance(value, six.text_type):
+        to_return = value.decode('utf-8')
+
+    return to_return
+
+
+def unicode_to_ascii(value):
+    """Replace the non-ASCII characters by the closest ASCII ones."""
+    return six.text_type(unidecode(value))
+
+
+# Available since editdistance 0.6.1.
+_edit_dist_le = getattr(editdistance, 'eval_criterion', None)
+
+
+def normalized_edit_dist(s1, s2, max_distance=None):
+    """Edit distance between two strings divided by the longest length.
+
+    If ``max_distance`` is given, the distances greater than it are not
+    computed exactly and 1.0 is returned instead.
+    """
+    max_len = max(len(s1), len(s2), 1)
+    if max_distance is not None:
+        # Reject the pairs that are too far apart, without computing their
+        # exact distance when possible.
+        max_edits = int(max_distance * max_len + 1e-9)
+        if abs(len(s1) - len(s2)) > max_edits:
+            return 1.0
+        if max_edits == 0:
+            return 0.0 if s1 == s2 else 1.0
+        if _edit_dist_le is not None and not _edit_dist_le(s1, s2,
+                                                           max_edits):
+            return 1.0
+    return float(editdistance.eval(s1, s2)) / max_len
@@ -27,32 +27,23 @@ from __future__ import absolute_import, print_function
 import copy
 import logging
 
-import six
 from inspire_dictdiffer import ADD, CHANGE, REMOVE, patch
 from inspire_dictdiffer.merge import Merger, UnresolvedConflictsException
 
 from .config import DictMergerOps
 from .conflict import Conflict, ConflictType
+from .diff3 import CONFLICT, diff3, merge_chunks
 from .errors import MergeError
 from .nothing import NOTHING
 from .utils import (
-    dedupe_list, del_obj_at_key_path, get_dotted_key_path, get_obj_at_key_path,
-    set_obj_at_key_path
+    ConfigTrie, dedupe_list, get_dotted_key_path, get_list_fields,
+    get_obj_at_key_path, get_objs_at_key_paths, set_obj_at_key_path,
+    without_objs_at_key_paths
 )
 
 LOGGER = logging.getLogger(__name__)
 
 
-def _get_list_fields(obj, res, key_path=()):
-    if isinstance(obj, list):
-        res.append(key_path)
-    elif isinstance(obj, dict):
-        for key, value in six.iteritems(obj):
-            _get_list_fields(value, res, key_path + (key, ))
-
-    return res
-
-
 def patch_to_conflict_set(patch):
     """Translates a dictdiffer conflict into a json_merger one."""
     patch_type, patched_key, value = patch
@@ -78,17 +69,34 @@ def patch_to_conflict_set(patch):
     return conflicts
 
 
+def _is_scalar_list(obj):
+    return (isinstance(obj, list) and
+            not any(isinstance(e, (dict, list)) for e in obj))
+
+
 class SkipListsMerger(object):
     """3-way Merger that ignores list fields."""
 
     def __init__(self, root, head, update, default_op,
-                 data_lists=None, custom_ops={}, key_path=None):
-        self.root = copy.deepcopy(root)
-        self.head = copy.deepcopy(head)
-        self.update = copy.deepcopy(update)
+                 data_lists=None, custom_ops={}, key_path=None,
+                 diff3_lists=None, conflict_sink=None, dry_run=False):
+        # In a dry run only the conflicts are computed, so the objects are
+        # not copied and the merged object is not built. The objects are
+        # never modified: the list fields are skipped by merging copies of
+        # the dicts leading to them.
+        self.dry_run = dry_run
+        if dry_run:
+            self.root = root
+            self.head = head
+            self.update = update
+        else:
+            self.root = copy.deepcopy(root)
+            self.head = copy.deepcopy(head)
+            self.update = copy.deepcopy(update)
         self.custom_ops = custom_ops
         self.default_op = self._operation_to_function(default_op)
-        self.data_lists = set(data_lists or [])
+        self.data_lists = ConfigTrie.build(data_lists)
+        self.diff3_lists = ConfigTrie.build(diff3_lists)
         self.key_path = key_path or []
 
         # We can have the same conflict appear more times because we keep only
@@ -96,38 +104,46 @@ class SkipListsMerger(object):
         # other as a fallback. Sometimes multiple fallback dict diffs
         # conflict with a single change.
         self.conflict_set = set()
+        # Optional :class:`json_merger.conflict.ConflictSink` receiving the
+        # conflicts instead of raising them.
+        self.conflict_sink = conflict_sink
         self.skipped_lists = set()
+        self.diff3_merged_lists = set()
         self.merged_root = None
         self.list_backups = {}
+        self._with_lists = None
 
     def _build_skipped_lists(self):
         lists = set()
-        lists.update(_get_list_fields(self.head, []))
-        lists.intersection_update(_get_list_fields(self.update, []))
+        lists.update(get_list_fields(self.head))
+        lists.intersection_update(get_list_fields(self.update))
         for list_ in lists:
-            dotted = get_dotted_key_path(list_, True)
-            if dotted not in self.data_lists:
+            if self.diff3_lists.at(list_).terminal:
+                if self._can_diff3(get_obj_at_key_path(self.root, list_),
+                                   get_obj_at_key_path(self.head, list_),
+                                   get_obj_at_key_path(self.update, list_)):
+                    self.diff3_merged_lists.add(list_)
+            elif not self.data_lists.at(list_).terminal:
                 self.skipped_lists.add(list_)
 
     def _backup_lists(self):
         self._build_skipped_lists()
-        for list_ in self.skipped_lists:
-            self.list_backups[list_] = (
-                get_obj_at_key_path(self.root, list_),
-                get_obj_at_key_path(self.head, list_),
-                get_obj_at_key_path(self.update, list_))
-            # The root is the only one that may not be there. Head and update
-            # are retrieved using list intersection.
-            del_obj_at_key_path(self.root, list_, False)
-            del_obj_at_key_path(self.head, list_)
-            del_obj_at_key_path(self.update, list_)
+        lists = self.skipped_lists.union(self.diff3_merged_lists)
+        root_lists = get_objs_at_key_paths(self.root, lists)
+        head_lists = get_objs_at_key_paths(self.head, lists)
+        update_lists = get_objs_at_key_paths(self.update, lists)
+        for list_ in lists:
+            self.list_backups[list_] = (root_lists[list_], head_lists[list_],
+                                        update_lists[list_])
+        # Merge copies of the objects without the lists, and keep the
+        # original objects to put them back afterwards.
+        self._with_lists = (self.root, self.head, self.update)
+        self.root = without_objs_at_key_paths(self.root, lists)
+        self.head = without_objs_at_key_paths(self.head, lists)
+        self.update = without_objs_at_key_paths(self.update, lists)
 
     def _restore_lists(self):
-        for list_, (bak_r, bak_h, bak_u) in six.iteritems(self.list_backups):
-            if bak_r is not None:
-                set_obj_at_key_path(self.root, list_, bak_r)
-            set_obj_at_key_path(self.head, list_, bak_h)
-            set_obj_at_key_path(self.update, list_, bak_u)
+        self.root, self.head, self.update = self._with_lists
 
     @property
     def conflicts(self):
@@ -136,6 +152,31 @@ class SkipListsMerger(object):
         # Make this compatible with the project convention (list of conflicts).
         return list(self.conflict_set)
 
+    @staticmethod
+    def _can_diff3(root, head, update):
+        return (_is_scalar_list(head) and _is_scalar_list(update) and
+                (_is_scalar_list(root) or not isinstance(root, list)))
+
+    def _merge_diff3(self, root, head, update, field_path):
+        """Merges ordered lists of scalars by their three-way diff.
+
+        Only the regions changed differently in head and update are
+        resolved by the strategy for the field. In that case the list
+        obtained with the other choice becomes a conflict.
+        """
+        if not isinstance(root, list):
+            root = []
+        chunks = diff3(root, head, update)
+        if not any(chunk[0] == CONFLICT for chunk in chunks):
+            return merge_chunks(chunks)
+
+        strategy = self._get_rule_for_field(field_path)
+        pick_head = strategy == 'f'
+        self.conflict_set.add(Conflict(ConflictType.SET_FIELD,
+                                       tuple(field_path),
+                                       merge_chunks(chunks, not pick_head)))
+        return merge_chunks(chunks, pick_head)
+
     def _merge_base_values(self):
         if self.head == self.update:
             self.merged_root = self.head
@@ -147,6 +188,10 @@ class SkipListsMerger(object):
             self.merged_root = self.update
         elif self.update == self.root:
             self.merged_root = self.head
+        elif self.diff3_lists.terminal and self._can_diff3(
+                self.root, self.head, self.update):
+            self.merged_root = self._merge_diff3(self.root, self.head,
+                                                 self.update, [])
         else:
             strategy = self._get_rule_for_field(self.key_path)
             self.merged_root, conflict = {
@@ -171,6 +216,13 @@ class SkipListsMerger(object):
             self._solve_dict_conflicts(non_list_merger, e.content)
 
         self._restore_lists()
+        if self.dry_run:
+            # Only look for the conflicts of the diff3 merged lists.
+            for list_ in self.diff3_merged_lists:
+                bak_r, bak_h, bak_u = self.list_backups[list_]
+                self._merge_diff3(bak_r, bak_h, bak_u, list(list_))
+            return
+
         remove_patches = []
         other_patches = []
         for patch_ in non_list_merger.unified_patches:
@@ -185,6 +237,12 @@ class SkipListsMerger(object):
                 self.root
             )
 
+        for list_ in self.diff3_merged_lists:
+            bak_r, bak_h, bak_u = self.list_backups[list_]
+            merged_list = self._merge_diff3(bak_r, bak_h, bak_u, list(list_))
+            self.merged_root = set_obj_at_key_path(self.merged_root, list_,
+                                                   merged_list, False)
+
     def _solve_dict_conflicts(self, non_list_merger, conflicts):
         strategies = [self._get_custom_strategy(conflict)
                       for conflict in conflicts]
@@ -265,4 +323,7 @@ class SkipListsMerger(object):
             self._merge_base_values()
 
         if self.conflict_set:
-            raise MergeError('Dictdiffer Errors', self.conflicts)
+            if self.conflict_sink is not None:
+                self.conflict_sink.extend(self.conflict_set)
+            else:
+                raise MergeError('Dictdiffer Errors', self.conflicts)
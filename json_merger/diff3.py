@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Three-way merge of ordered lists of scalars based on the Myers diff."""
+
+from __future__ import absolute_import, print_function
+
+STABLE = 'stable'
+CONFLICT = 'conflict'
+
+
+def myers_matches(l1, l2):
+    """Returns the pairs of indices of l1 and l2 kept by a shortest edit.
+
+    Uses the O(ND) algorithm of Myers, in which D is the size of the edit
+    script, so that lists with few changes are compared in near-linear time.
+    """
+    # Skip the common prefix and suffix as they are always kept.
+    start = 0
+    while (start < len(l1) and start < len(l2) and
+           l1[start] == l2[start]):
+        start += 1
+    end1, end2 = len(l1), len(l2)
+    while end1 > start and end2 > start and l1[end1 - 1] == l2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+
+    matches = [(i, i) for i in range(start)]
+    matches.extend(_myers_middle(l1, l2, start, end1, start, end2))
+    matches.extend((end1 + i, end2 + i) for i in range(len(l1) - end1))
+    return matches
+
+
+def _myers_middle(l1, l2, start1, end1, start2, end2):
+    n = end1 - start1
+    m = end2 - start2
+    if not n or not m:
+        return []
+
+    max_d = n + m
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(list(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and l1[start1 + x] == l2[start2 + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, offset, n, m, start1, start2)
+    return []
+
+
+def _backtrack(trace, offset, x, y, start1, start2):
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[offset + prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((start1 + x, start2 + y))
+        if d > 0:
+            x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+
+def diff3(root, head, update):
+    """Splits the three lists into stable and changed chunks.
+
+    Returns a list of chunks, each of them being either:
+        * ``(STABLE, items)`` -- items on which head and update agree.
+        * ``(CONFLICT, root_items, head_items, update_items)`` -- a region
+          changed differently in head and update.
+    """
+    head_matches = dict(myers_matches(root, head))
+    update_matches = dict(myers_matches(root, update))
+
+    chunks = []
+    root_idx = head_idx = update_idx = 0
+    while True:
+        # Take the longest run of root elements kept in both lists.
+        stable_len = 0
+        while (head_matches.get(root_idx + stable_len) ==
+               head_idx + stable_len and
+               update_matches.get(root_idx + stable_len) ==
+               update_idx + stable_len):
+            stable_len += 1
+        if stable_len:
+            _append_stable(chunks, root[root_idx:root_idx + stable_len])
+            root_idx += stable_len
+            head_idx += stable_len
+            update_idx += stable_len
+            continue
+
+        # Find the next root element kept in both lists.
+        next_root_idx = root_idx
+        while next_root_idx < len(root) and not (
+                next_root_idx in head_matches and
+                next_root_idx in update_matches):
+            next_root_idx += 1
+
+        if next_root_idx < len(root):
+            next_head_idx = head_matches[next_root_idx]
+            next_update_idx = update_matches[next_root_idx]
+        else:
+            next_head_idx = len(head)
+            next_update_idx = len(update)
+
+        root_part = root[root_idx:next_root_idx]
+        head_part = head[head_idx:next_head_idx]
+        update_part = update[update_idx:next_update_idx]
+        if root_part or head_part or update_part:
+            if head_part == root_part or head_part == update_part:
+                _append_stable(chunks, update_part)
+            elif update_part == root_part:
+                _append_stable(chunks, head_part)
+            else:
+                chunks.append((CONFLICT, root_part, head_part, update_part))
+
+        if next_root_idx >= len(root):
+            break
+        root_idx = next_root_idx
+        head_idx = next_head_idx
+        update_idx = next_update_idx
+
+    return chunks
+
+
+def _append_stable(chunks, items):
+    if not items:
+        return
+    if chunks and chunks[-1][0] == STABLE:
+        chunks[-1] = (STABLE, chunks[-1][1] + items)
+    else:
+        chunks.append((STABLE, items))
+
+
+def merge_chunks(chunks, pick_head=True):
+    """Builds a list from diff3 chunks picking one side of the conflicts."""
+    result = []
+    for chunk in chunks:
+        if chunk[0] == STABLE:
+            result.extend(chunk[1])
+        elif pick_head:
+            result.extend(chunk[2])
+        else:
+            result.extend(chunk[3])
+    return result
@@ -49,3 +49,21 @@ class MaxThresholdExceededError(Exception):
         """
         super(MaxThresholdExceededError, self).__init__(message)
         self.message = message
+
+
+class TimeBudgetExceededError(MaxThresholdExceededError):
+    """Time Budget Exceeded Error."""
+
+
+class MergeAbortedError(MergeError):
+    """Merge Aborted Error."""
+
+    def __init__(self, message, content, key_path):
+        """
+        Attributes:
+            message: Error message.
+            content: List of conflicts that occured before aborting.
+            key_path: Path of the conflict that aborted the merge.
+        """
+        super(MergeAbortedError, self).__init__(message, content)
+        self.key_path = key_path
@@ -24,11 +24,13 @@
 
 from __future__ import absolute_import, print_function
 
+import time
 from collections import deque
 
 import six
 
 from .comparator import DefaultComparator
+from .errors import TimeBudgetExceededError
 from .nothing import NOTHING
 from .stats import ListMatchStats
 
@@ -47,34 +49,43 @@ class BeforeNodes(object):
             self.head_node, self.update_node)
 
 
+# Keys are (target, source), values are the pair of lists compared by the
+# comparator and the source list from which to search.
+_COMPARATOR_PAIRS = {
+    ('root', 'head'): (('root', 'head'), 'l2'),
+    ('head', 'root'): (('root', 'head'), 'l1'),
+    ('root', 'update'): (('root', 'update'), 'l2'),
+    ('update', 'root'): (('root', 'update'), 'l1'),
+    ('head', 'update'): (('head', 'update'), 'l2'),
+    ('update', 'head'): (('head', 'update'), 'l1'),
+}
+
+
 class ListMatchGraphBuilder(object):
 
     def __init__(self, root, head, update, sources,
-                 comparator_cls=DefaultComparator):
+                 comparator_cls=DefaultComparator, with_stats=True,
+                 deadline=None):
         self.root = root
         self.head = head
         self.update = update
         self.sources = sources
+        self.comparator_cls = comparator_cls
+        # Wall-clock time after which matching is aborted.
+        self.deadline = deadline
 
-        self.root_head_comparator = comparator_cls(self.root, self.head)
-        self.root_update_comparator = comparator_cls(self.root, self.update)
-        self.head_update_comparator = comparator_cls(self.head, self.update)
-
-        # Keys are (target, source), values are comparator_instance and
-        # the source list from which to search.
-        self.comparators = {
-            ('root', 'head'): (self.root_head_comparator, 'l2'),
-            ('head', 'root'): (self.root_head_comparator, 'l1'),
-            ('root', 'update'): (self.root_update_comparator, 'l2'),
-            ('update', 'root'): (self.root_update_comparator, 'l1'),
-            ('head', 'update'): (self.head_update_comparator, 'l2'),
-            ('update', 'head'): (self.head_update_comparator, 'l1'),
-        }
+        # Comparators are built only when one of their matches is needed.
+        self._comparators = {}
 
         self.node_data = {}
         self.graph = {}
-        self.head_stats = ListMatchStats(head, root)
-        self.update_stats = ListMatchStats(update, root)
+        self.with_stats = with_stats
+        if with_stats:
+            self.head_stats = ListMatchStats(head, root)
+            self.update_stats = ListMatchStats(update, root)
+        else:
+            self.head_stats = None
+            self.update_stats = None
 
         self._node_src_indices = {}
         self._head_idx_to_node = {}
@@ -86,6 +97,29 @@ class ListMatchGraphBuilder(object):
         self.multiple_match_choice_idx = set()
         self.multiple_match_choices = []
 
+    def _get_comparator(self, lists):
+        if lists not in self._comparators:
+            l1, l2 = lists
+            comparator = self.comparator_cls(getattr(self, l1),
+                                             getattr(self, l2))
+            # Comparators computing all their matches at once check the
+            # deadline themselves.
+            comparator.deadline = self.deadline
+            self._comparators[lists] = comparator
+        return self._comparators[lists]
+
+    @property
+    def root_head_comparator(self):
+        return self._get_comparator(('root', 'head'))
+
+    @property
+    def root_update_comparator(self):
+        return self._get_comparator(('root', 'update'))
+
+    @property
+    def head_update_comparator(self):
+        return self._get_comparator(('head', 'update'))
+
     def _new_node_id(self):
         node_id = self._next_node_id
         self._next_node_id += 1
@@ -115,9 +149,15 @@ class ListMatchGraphBuilder(object):
         # Start a BFS of matching elements.
         q = deque([(source, source_idx)])
         while q:
+            if self.deadline is not None and time.time() > self.deadline:
+                raise TimeBudgetExceededError(
+                    'Time budget exceeded while matching list entities.')
             curr_src, curr_idx = q.popleft()
             for target in other_two[curr_src]:
-                comparator, cmp_list = self.comparators[(target, curr_src)]
+                if not getattr(self, target):
+                    continue
+                lists, cmp_list = _COMPARATOR_PAIRS[(target, curr_src)]
+                comparator = self._get_comparator(lists)
                 # cmp_list is either 'l1' or 'l2'
                 # (the paremeter for the comparator class convetion)
                 matches = comparator.get_matches(cmp_list, curr_idx)
@@ -147,28 +187,42 @@ class ListMatchGraphBuilder(object):
                                                    for r, h, u in matches])
 
     def _populate_nodes(self):
-        for idx, obj in enumerate(self.head):
-            r_elems, h_elems, u_elems = self._get_matches('head', idx, obj)
-            if 'head' in self.sources:
-                self._add_matches(r_elems, h_elems, u_elems)
-            if len(r_elems) == 1 and r_elems[0][0] >= 0:
-                self.head_stats.add_root_match(idx, r_elems[0][0])
-
-        for idx, obj in enumerate(self.update):
-            r_elems, h_elems, u_elems = self._get_matches('update', idx, obj)
-            # Only add the node to the graph only if not already added.
-            if ('update' in self.sources and
-                    idx not in self._update_idx_to_node):
-                self._add_matches(r_elems, h_elems, u_elems)
-            if len(r_elems) == 1 and r_elems[0][0] >= 0:
-                self.update_stats.add_root_match(idx, r_elems[0][0])
+        # Lists that are not a source of entities need to be walked only
+        # for computing their stats.
+        if 'head' in self.sources or self.with_stats:
+            for idx, obj in enumerate(self.head):
+                r_elems, h_elems, u_elems = self._get_matches('head', idx,
+                                                              obj)
+                if 'head' in self.sources:
+                    self._add_matches(r_elems, h_elems, u_elems)
+                if (self.with_stats and len(r_elems) == 1 and
+                        r_elems[0][0] >= 0):
+                    self.head_stats.add_root_match(idx, r_elems[0][0])
+
+        if 'update' in self.sources or self.with_stats:
+            for idx, obj in enumerate(self.update):
+                # Only add the node to the graph only if not already added.
+                if (not self.with_stats and
+                        idx in self._update_idx_to_node):
+                    continue
+                r_elems, h_elems, u_elems = self._get_matches('update', idx,
+                                                              obj)
+                if ('update' in self.sources and
+                        idx not in self._update_idx_to_node):
+                    self._add_matches(r_elems, h_elems, u_elems)
+                if (self.with_stats and len(r_elems) == 1 and
+                        r_elems[0][0] >= 0):
+                    self.update_stats.add_root_match(idx, r_elems[0][0])
 
         # Add stats from built nodes.
-        for root_idx, head_idx, update_idx in self._node_src_indices.values():
-            if head_idx >= 0:
-                self.head_stats.move_to_result(head_idx)
-            if update_idx >= 0:
-                self.update_stats.move_to_result(update_idx)
+        if self.with_stats:
+            for _, head_idx, update_idx in self._node_src_indices.values():
+                if head_idx >= 0:
+                    self.head_stats.move_to_result(head_idx)
+                if update_idx >= 0:
+                    self.update_stats.move_to_result(update_idx)
+            self.head_stats.finalize()
+            self.update_stats.finalize()
 
         # Move the unique multiple match indices to conflicts.
         for r_idx, h_idx, u_idx in self.multiple_match_choice_idx:
@@ -189,6 +243,31 @@ class ListMatchGraphBuilder(object):
                 return idx_to_node[idx]
         return None
 
+    def build_nodes(self, pick_first='head'):
+        """Returns the matched entities without ordering them in a graph.
+
+        The entities are returned in the order of the pick_first list,
+        followed by the ones found only in the other list.
+        """
+        self._populate_nodes()
+
+        idx_to_node = {
+            'head': self._head_idx_to_node,
+            'update': self._update_idx_to_node
+        }
+        sources = [pick_first] + [s for s in ('head', 'update')
+                                  if s != pick_first]
+        ordered = []
+        visited = set()
+        for source in sources:
+            for idx in sorted(idx_to_node[source]):
+                node = idx_to_node[source][idx]
+                if node not in visited:
+                    visited.add(node)
+                    ordered.append(self.node_data[node])
+
+        return ordered
+
     def build_graph(self):
         self._populate_nodes()
 
@@ -26,16 +26,23 @@
 
 from __future__ import absolute_import, print_function
 
+import logging
 import os
+import time
 
-from .comparator import DefaultComparator
-from .config import UnifierOps
+from .comparator import DefaultComparator, keyed_comparator
+from .config import UnifierFallbackOps, UnifierOps
 from .conflict import Conflict, ConflictType
-from .errors import MaxThresholdExceededError, MergeError
+from .errors import (
+    MaxThresholdExceededError, MergeError, TimeBudgetExceededError
+)
 from .graph_builder import (
     ListMatchGraphBuilder, sort_cyclic_graph_best_effort, toposort
 )
-from .nothing import Nothing
+from .nothing import NOTHING, Nothing
+from .stats import ListMatchStats
+
+LOGGER = logging.getLogger(__name__)
 
 _SOURCES = {
     UnifierOps.KEEP_ONLY_UPDATE_ENTITIES: ['update'],
@@ -71,7 +78,8 @@ _RAISE_ON_UPDATE_CHANGED = [
 class ListUnifier(object):
 
     def __init__(self, root, head, update, operation,
-                 comparator_cls=DefaultComparator):
+                 comparator_cls=DefaultComparator, stats=True, limits=None,
+                 ordered=True, sort_key=None, conflict_sink=None):
         if operation not in UnifierOps.allowed_ops:
             raise ValueError('Operation %r not permitted' % operation)
 
@@ -85,6 +93,9 @@ class ListUnifier(object):
 
         # Whether to raise error on deleting a head entity.
         self.raise_on_head_delete = operation in _RAISE_ERROR_OPS
+        # Whether to compute the match stats. The operations raising on
+        # head delete always need them in order to find the removed entities.
+        self.stats = stats or self.raise_on_head_delete
         # Whether to raise on new entity in update
         self.raise_on_new_update = operation in _RAISE_ON_UPDATE_CHANGED
         # Sources from which to keep entities.
@@ -92,10 +103,138 @@ class ListUnifier(object):
         # Source from which to pick the first element when they can be
         # interchanged in the topological sort.
         self.pick_first = _PICK_FIRST[operation]
+        # Instance of :class:`json_merger.config.UnifierLimits` or None.
+        self.limits = limits
+        # Whether the order of the entities in the lists matters.
+        self.ordered = ordered
+        # Function returning the key by which the lists might be sorted.
+        self.sort_key = sort_key
+        # Optional :class:`json_merger.conflict.ConflictSink` receiving the
+        # conflicts instead of raising them.
+        self.conflict_sink = conflict_sink
 
         self.unified = []
 
     def unify(self):
+        if (self.ordered and self.sort_key is not None and
+                self._unify_sorted()):
+            return
+
+        deadline = None
+        if self.limits is not None:
+            reason = self.limits.check_lists(self.root, self.head,
+                                             self.update)
+            if reason:
+                return self._unify_fallback(reason)
+            if self.limits.time_budget is not None:
+                deadline = time.time() + self.limits.time_budget
+
+        comparator_cls = self.comparator_cls
+        if not self.ordered:
+            # Without an order to keep the entities are matched with a hash
+            # join on their keys when the comparator defines them.
+            comparator_cls = (keyed_comparator(comparator_cls) or
+                              comparator_cls)
+        try:
+            self._unify_entities(comparator_cls, deadline)
+        except TimeBudgetExceededError as e:
+            return self._unify_fallback(e.message)
+
+    def _get_sorted_keys(self, lst):
+        keys = [self.sort_key(obj) for obj in lst]
+        try:
+            if all(k1 < k2 for k1, k2 in zip(keys, keys[1:])):
+                return keys
+        except TypeError:
+            pass
+        return None
+
+    def _unify_sorted(self):
+        """Aligns lists sorted by their key with a three-way merge join.
+
+        Entities having the same key are matched. Returns False without
+        doing anything if any of the lists is not strictly sorted by key.
+        """
+        lists = (self.root, self.head, self.update)
+        keys = []
+        for lst in lists:
+            lst_keys = self._get_sorted_keys(lst)
+            if lst_keys is None:
+                LOGGER.debug("Lists not sorted by key, aligning by graph.")
+                return False
+            keys.append(lst_keys)
+
+        if self.stats:
+            self.head_stats = ListMatchStats(self.head, self.root)
+            self.update_stats = ListMatchStats(self.update, self.root)
+
+        positions = [0, 0, 0]
+        while True:
+            current = [keys[i][pos] for i, pos in enumerate(positions)
+                       if pos < len(keys[i])]
+            if not current:
+                break
+            min_key = min(current)
+
+            indices = []
+            for i, pos in enumerate(positions):
+                if pos < len(keys[i]) and keys[i][pos] == min_key:
+                    indices.append(pos)
+                    positions[i] += 1
+                else:
+                    indices.append(-1)
+            root_idx, head_idx, update_idx = indices
+
+            if self.stats and root_idx >= 0:
+                if head_idx >= 0:
+                    self.head_stats.add_root_match(head_idx, root_idx)
+                if update_idx >= 0:
+                    self.update_stats.add_root_match(update_idx, root_idx)
+
+            if (('head' in self.sources and head_idx >= 0) or
+                    ('update' in self.sources and update_idx >= 0)):
+                self.unified.append(tuple(
+                    lst[idx] if idx >= 0 else NOTHING
+                    for lst, idx in zip(lists, indices)))
+                if self.stats:
+                    if head_idx >= 0:
+                        self.head_stats.move_to_result(head_idx)
+                    if update_idx >= 0:
+                        self.update_stats.move_to_result(update_idx)
+
+        if self.stats:
+            self.head_stats.finalize()
+            self.update_stats.finalize()
+        self._raise_on_result_conflicts([])
+        return True
+
+    def _unify_fallback(self, reason):
+        fallback = self.limits.fallback
+        LOGGER.warning("List unification limits exceeded: %s. Using %s.",
+                       reason, fallback)
+        if fallback == UnifierFallbackOps.RAISE:
+            raise MaxThresholdExceededError(reason)
+        elif fallback == UnifierFallbackOps.KEEP_HEAD:
+            self._keep_head()
+        else:
+            comparator_cls = keyed_comparator(self.comparator_cls)
+            if comparator_cls is None:
+                LOGGER.warning("%s defines no keys. Using KEEP_HEAD.",
+                               self.comparator_cls.__name__)
+                return self._keep_head()
+            self._unify_entities(comparator_cls)
+
+    def _keep_head(self):
+        self.unified = [(NOTHING, obj, NOTHING) for obj in self.head]
+        if self.stats:
+            self.head_stats = ListMatchStats(self.head, self.root)
+            self.update_stats = ListMatchStats(self.update, self.root)
+            for idx in range(len(self.head)):
+                self.head_stats.move_to_result(idx)
+            self.head_stats.finalize()
+            self.update_stats.finalize()
+
+    def _unify_entities(self, comparator_cls, deadline=None):
         MAX_DETAILED_CONFLICTS = os.environ.get("MAX_DETAILED_CONFLICTS")
         MAX_DETAILED_CONFLICTS = (
             int(MAX_DETAILED_CONFLICTS)
@@ -103,8 +242,11 @@ class ListUnifier(object):
         )
         graph_builder = ListMatchGraphBuilder(
             self.root, self.head, self.update, self.sources,
-            self.comparator_cls)
-        graph, nodes = graph_builder.build_graph()
+            comparator_cls, self.stats, deadline)
+        if self.ordered:
+            graph, nodes = graph_builder.build_graph()
+        else:
+            self.unified = graph_builder.build_nodes(self.pick_first)
         self.head_stats = graph_builder.head_stats
         self.update_stats = graph_builder.update_stats
 
@@ -122,14 +264,20 @@ class ListUnifier(object):
             conflicts = [Conflict(ConflictType.MANUAL_MERGE, (), choice)
                          for choice in multiple_match_choices]
 
-        try:
-            node_order = toposort(graph, self.pick_first)
-        except ValueError:
-            node_order = sort_cyclic_graph_best_effort(graph, self.pick_first)
-            conflicts.append(Conflict(ConflictType.REORDER, (), None))
+        if self.ordered:
+            try:
+                node_order = toposort(graph, self.pick_first)
+            except ValueError:
+                node_order = sort_cyclic_graph_best_effort(graph,
+                                                           self.pick_first)
+                conflicts.append(Conflict(ConflictType.REORDER, (), None))
+
+            for node in node_order:
+                self.unified.append(nodes[node])
+
+        self._raise_on_result_conflicts(conflicts)
 
-        for node in node_order:
-            self.unified.append(nodes[node])
+    def _raise_on_result_conflicts(self, conflicts):
         if (self.raise_on_head_delete and
                 self.head_stats.not_in_result):
             removed = self.head_stats.not_in_result
@@ -148,4 +296,7 @@ class ListUnifier(object):
             for idx in sorted(idx_to_remove, reverse=True):
                 del self.unified[idx]
         if conflicts:
-            raise MergeError('Errors in list unifier', conflicts)
+            if self.conflict_sink is not None:
+                self.conflict_sink.extend(conflicts)
+            else:
+                raise MergeError('Errors in list unifier', conflicts)
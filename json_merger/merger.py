@@ -30,18 +30,30 @@ import copy
 import logging
 
 from .comparator import DefaultComparator
+from .conflict import ConflictSink, NullConflictSink
 from .dict_merger import SkipListsMerger
 from .errors import MergeError
 from .list_unify import ListUnifier
-from .utils import (
-    get_conf_set_for_key_path, get_dotted_key_path, get_obj_at_key_path,
-    set_obj_at_key_path
-)
+from .utils import ConfigTrie, KeyPath, KeyPathAccessor, get_list_fields
 
 PLACEHOLDER_STR = '#$PLACEHOLDER$#'
 LOGGER = logging.getLogger(__name__)
 
 
+def _with_value_at_key_path(obj, key_path, value):
+    # Like set_obj_at_key_path with raise_key_error=False, but it copies the
+    # dicts on the path instead of changing them.
+    if not key_path:
+        return value
+    if not isinstance(obj, dict) or (len(key_path) > 1 and
+                                     key_path[0] not in obj):
+        return obj
+    new_obj = dict(obj)
+    new_obj[key_path[0]] = _with_value_at_key_path(obj.get(key_path[0]),
+                                                   key_path[1:], value)
+    return new_obj
+
+
 class Merger(object):
     """Class that merges two JSON objects that share a common ancestor.
 
@@ -53,7 +65,11 @@ class Merger(object):
     def __init__(self, root, head, update,
                  default_dict_merge_op, default_list_merge_op,
                  list_dict_ops=None, list_merge_ops=None,
-                 comparators=None, data_lists=None):
+                 comparators=None, data_lists=None,
+                 list_limits=None, default_list_limits=None,
+                 unordered_lists=None, sort_keys=None,
+                 diff3_data_lists=None, collect_stats=True, dry_run=False,
+                 fail_fast_on=None):
         """
         Args:
             root: A common ancestor of the two objects being merged.
@@ -101,6 +117,53 @@ class Merger(object):
             data_lists: List of config strings defining the lists that are not
                 treated as lists of entities.
 
+            list_limits: Defines resource limits for unifying lists of
+                entities.
+
+                Dict formatted as:
+                    * keys -- a config string
+                    * values -- a :class:`json_merger.config.UnifierLimits`
+                      instance
+
+            default_list_limits
+              (:class:`json_merger.config.UnifierLimits` instance):
+                Resource limits for the lists without custom limits.
+
+            unordered_lists: List of config strings defining the lists of
+                entities in which the order has no meaning. Their entities
+                are matched without building an order graph, so they never
+                raise REORDER conflicts.
+
+            sort_keys: Defines key functions for lists of entities that are
+                usually sorted. If the root, head and update lists are all
+                strictly sorted by the key they are aligned in linear time
+                by matching the entities having the same key. Otherwise they
+                are aligned using the comparators.
+
+                Dict formatted as:
+                    * keys -- a config string
+                    * values -- a function receiving an entity and returning
+                      its key
+
+            diff3_data_lists: List of config strings defining data lists of
+                scalars in which the order matters. They are merged by a
+                three-way diff of their elements, so that changes to
+                different parts of the list do not conflict.
+
+            collect_stats: Whether to compute the ``head_stats`` and
+                ``update_stats`` of the merge.
+
+            dry_run: If set, the merge only computes the ``conflicts``. The
+                ``merged_root``, the aligned copies and the stats are not
+                built and stay ``None`` or empty. The ``root``, ``head`` and
+                ``update`` members are then the given objects, not copies,
+                and they are never modified.
+
+            fail_fast_on: Iterable of
+                :class:`json_merger.conflict.ConflictType` members. The merge
+                is aborted as soon as a conflict of one of these types occurs,
+                by raising :class:`json_merger.errors.MergeAbortedError`.
+
         Note:
             A configuration string represents the path towards a list field in
             the object sepparated with dots.
@@ -114,25 +177,49 @@ class Merger(object):
                 * the config string for the tags lists is ``'lst.tags'``
         """
         self.comparators = comparators or {}
-        self.data_lists = set(data_lists or [])
+        self.diff3_data_lists = set(diff3_data_lists or [])
+        self.data_lists = set(data_lists or []).union(self.diff3_data_lists)
+        self._data_lists_trie = ConfigTrie(self.data_lists)
+        self._diff3_data_lists_trie = ConfigTrie(self.diff3_data_lists)
         self.list_dict_ops = list_dict_ops or {}
         self.list_merge_ops = list_merge_ops or {}
+        self.list_limits = list_limits or {}
+        self.default_list_limits = default_list_limits
+        self.unordered_lists = set(unordered_lists or [])
+        self.sort_keys = sort_keys or {}
 
         self.default_dict_merge_op = default_dict_merge_op
         self.default_list_merge_op = default_list_merge_op
 
-        self.root = copy.deepcopy(root)
-        self.head = copy.deepcopy(head)
-        self.update = copy.deepcopy(update)
+        self.dry_run = dry_run
+        if dry_run:
+            # A dry run never changes the objects, so they are not copied.
+            self.root = root
+            self.head = head
+            self.update = update
+        else:
+            self.root = copy.deepcopy(root)
+            self.head = copy.deepcopy(head)
+            self.update = copy.deepcopy(update)
+        self.fail_fast_on = frozenset(fail_fast_on or ())
+        self.collect_stats = collect_stats and not dry_run
         self.head_stats = {}
         self.update_stats = {}
 
         self.conflicts = []
         self.merged_root = None
-
-        self.aligned_root = copy.deepcopy(root)
-        self.aligned_head = copy.deepcopy(head)
-        self.aligned_update = copy.deepcopy(update)
+        # Accessors of the list fields, by key path, reused for every object
+        # having them.
+        self._accessors = {}
+
+        if dry_run:
+            self.aligned_root = None
+            self.aligned_head = None
+            self.aligned_update = None
+        else:
+            self.aligned_root = copy.deepcopy(root)
+            self.aligned_head = copy.deepcopy(head)
+            self.aligned_update = copy.deepcopy(update)
 
     def merge(self):
         """Populates result members.
@@ -158,6 +245,10 @@ class Merger(object):
             :class:`json_merger.errors.MergeError` : If conflicts occur during
                 the call.
 
+            :class:`json_merger.errors.MergeAbortedError` : If a conflict of
+                one of the ``fail_fast_on`` types occurs. The merge stops
+                there and ``merged_root`` is not populated.
+
         Example:
             >>> from json_merger import Merger
             >>> # We compare people by their name
@@ -219,17 +310,100 @@ class Merger(object):
             and aligned_update are always populated by following the
             startegies set for the merger instance.
         """
-        self.merged_root = self._recursive_merge(self.root, self.head,
-                                                 self.update)
+        merged_root = self._recursive_merge(self.root, self.head,
+                                            self.update, KeyPath())
+        if not self.dry_run:
+            self.merged_root = merged_root
         if self.conflicts:
             raise MergeError('Conflicts Occurred in Merge Process',
                              self.conflicts)
 
-    def _recursive_merge(self, root, head, update, key_path=()):
-        dotted_key_path = get_dotted_key_path(key_path, filter_int_keys=True)
+    def align(self):
+        """Populates only the aligned copies and the stats.
 
+        The lists of entities are matched exactly as in :meth:`merge`, but
+        the other values are not merged and no conflicts are recorded. This
+        is faster when only the aligned views are needed.
+
+        Attributes:
+            aligned_root, aligned_head, aligned_update: Copies of root, head
+                and update in which all matched list entities have the same
+                list index, including the entities of nested lists. They
+                share the values outside of the aligned lists with the
+                ``root``, ``head`` and ``update`` members.
+
+            head_stats, update_stats: Stats for each list field present in the
+                head or update objects. Instance of
+                :class:`json_merger.stats.ListMatchStats`
+
+        Note:
+            Unlike :meth:`merge`, which only aligns the outermost lists of
+            entities and keeps the entities as they are, ``align`` also
+            aligns the lists nested inside the matched entities.
+
+        Example:
+            >>> from json_merger import Merger
+            >>> from json_merger.config import DictMergerOps, UnifierOps
+            >>> m = Merger({'tags': ['a', 'b']}, {'tags': ['a', 'b', 'c']},
+            ...            {'tags': ['b', 'd']},
+            ...            DictMergerOps.FALLBACK_KEEP_HEAD,
+            ...            UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST)
+            >>> m.align()
+            >>> m.aligned_head['tags']
+            ['a', 'b', 'c', '#$PLACEHOLDER$#']
+            >>> m.aligned_update['tags']
+            ['#$PLACEHOLDER$#', 'b', '#$PLACEHOLDER$#', 'd']
+            >>> m.merged_root is None and m.conflicts == []
+            True
+        """
+        self.aligned_root, self.aligned_head, self.aligned_update = \
+            self._recursive_align(self.root, self.head, self.update,
+                                  KeyPath())
+
+    def _recursive_align(self, root, head, update, key_path):
         if (isinstance(head, list) and isinstance(update, list) and
-                dotted_key_path not in self.data_lists):
+                key_path.dotted not in self.data_lists):
+            lists_to_align = [()]
+            if not isinstance(root, list):
+                root = []
+        elif isinstance(head, dict) and isinstance(update, dict):
+            data_lists = self._data_lists_trie.at(key_path)
+            lists_to_align = set(get_list_fields(head))
+            lists_to_align.intersection_update(get_list_fields(update))
+            lists_to_align = [list_field for list_field in lists_to_align
+                              if not data_lists.at(list_field).terminal]
+        else:
+            return root, head, update
+
+        aligned = [root, head, update]
+        for list_field in lists_to_align:
+            absolute_key_path = key_path.extend(list_field)
+
+            accessor = self._get_accessor(list_field)
+            unifier = self._unify_lists(accessor.get(root, []),
+                                        accessor.get(head, []),
+                                        accessor.get(update, []),
+                                        absolute_key_path,
+                                        NullConflictSink())
+
+            aligned_lists = ([], [], [])
+            for idx, objects in enumerate(unifier.unified):
+                aligned_objects = self._recursive_align(
+                    objects[0], objects[1], objects[2],
+                    absolute_key_path.child(idx))
+                for aligned_list, obj in zip(aligned_lists, aligned_objects):
+                    aligned_list.append(obj or PLACEHOLDER_STR)
+
+            for i, aligned_list in enumerate(aligned_lists):
+                aligned[i] = _with_value_at_key_path(aligned[i], list_field,
+                                                     aligned_list)
+            self._store_stats(unifier, absolute_key_path.tuple)
+
+        return tuple(aligned)
+
+    def _recursive_merge(self, root, head, update, key_path):
+        if (isinstance(head, list) and isinstance(update, list) and
+                key_path.dotted not in self.data_lists):
             # In this case we are merging two lists of objects.
             lists_to_unify = [()]
             if not isinstance(root, list):
@@ -237,15 +411,17 @@ class Merger(object):
         else:
             # Otherwise we merge everything but the lists using DictMergerOps.
             m = self._merge_objects(root, head, update, key_path)
-            root = m.merged_root
+            if not self.dry_run:
+                root = m.merged_root
             lists_to_unify = m.skipped_lists
 
         for list_field in lists_to_unify:
-            absolute_key_path = key_path + list_field
+            absolute_key_path = key_path.extend(list_field)
 
-            root_l = get_obj_at_key_path(root, list_field, [])
-            head_l = get_obj_at_key_path(head, list_field, [])
-            update_l = get_obj_at_key_path(update, list_field, [])
+            accessor = self._get_accessor(list_field)
+            root_l = accessor.get(root, [])
+            head_l = accessor.get(head, [])
+            update_l = accessor.get(update, [])
 
             unifier = self._unify_lists(root_l, head_l, update_l,
                                         absolute_key_path)
@@ -260,38 +436,48 @@ class Merger(object):
                     update_obj
                 )
                 new_obj = self._recursive_merge(root_obj, head_obj, update_obj,
-                                                absolute_key_path + (idx, ))
+                                                absolute_key_path.child(idx))
                 new_list.append(new_obj)
 
-            root = set_obj_at_key_path(root, list_field, new_list)
-            self._build_aligned_lists_and_stats(unifier, absolute_key_path)
+            if self.dry_run:
+                continue
+            root = accessor.set(root, new_list)
+            self._build_aligned_lists_and_stats(unifier,
+                                                absolute_key_path.tuple)
 
         return root
 
     def _merge_objects(self, root, head, update, key_path):
-        data_lists = get_conf_set_for_key_path(self.data_lists, key_path)
+        data_lists = self._data_lists_trie.at(key_path)
+        diff3_lists = self._diff3_data_lists_trie.at(key_path)
 
         LOGGER.debug("Merging non-lists at %s", key_path)
 
         object_merger = SkipListsMerger(root, head, update,
                                         self.default_dict_merge_op,
                                         data_lists, self.list_dict_ops,
-                                        key_path)
-
-        try:
-            object_merger.merge()
-        except MergeError as e:
-            self.conflicts.extend(c.with_prefix(key_path) for c in e.content)
+                                        key_path.tuple, diff3_lists,
+                                        ConflictSink(self.conflicts, key_path,
+                                                     self.fail_fast_on),
+                                        self.dry_run)
+        object_merger.merge()
 
         return object_merger
 
-    def _unify_lists(self, root, head, update, key_path):
-        dotted_key_path = get_dotted_key_path(key_path, True)
+    def _unify_lists(self, root, head, update, key_path, conflict_sink=None):
+        dotted_key_path = key_path.dotted
+        if conflict_sink is None:
+            conflict_sink = ConflictSink(self.conflicts, key_path,
+                                         self.fail_fast_on)
 
         operation = self.list_merge_ops.get(dotted_key_path,
                                             self.default_list_merge_op)
         comparator_cls = self.comparators.get(dotted_key_path,
                                               DefaultComparator)
+        limits = self.list_limits.get(dotted_key_path,
+                                      self.default_list_limits)
+        ordered = dotted_key_path not in self.unordered_lists
+        sort_key = self.sort_keys.get(dotted_key_path)
 
         LOGGER.debug(
             "Unifying lists at %s using operation %s and comparator %s",
@@ -300,11 +486,12 @@ class Merger(object):
             comparator_cls,
         )
         list_unifier = ListUnifier(root, head, update,
-                                   operation, comparator_cls)
-        try:
-            list_unifier.unify()
-        except MergeError as e:
-            self.conflicts.extend(c.with_prefix(key_path) for c in e.content)
+                                   operation, comparator_cls,
+                                   stats=self.collect_stats,
+                                   limits=limits, ordered=ordered,
+                                   sort_key=sort_key,
+                                   conflict_sink=conflict_sink)
+        list_unifier.unify()
 
         return list_unifier
 
@@ -320,13 +507,22 @@ class Merger(object):
             update_list.append(update_obj or PLACEHOLDER_STR)
 
         # Try to put back the list if the key path existed in the first place.
-        self.aligned_root = set_obj_at_key_path(self.aligned_root,
-                                                key_path, root_list, False)
-        self.aligned_head = set_obj_at_key_path(self.aligned_head,
-                                                key_path, head_list, False)
-        self.aligned_update = set_obj_at_key_path(self.aligned_update,
-                                                  key_path, update_list, False)
-
-        # Also copy over the stats.
-        self.head_stats[key_path] = list_unifier.head_stats
-        self.update_stats[key_path] = list_unifier.update_stats
+        accessor = self._get_accessor(key_path)
+        self.aligned_root = accessor.set(self.aligned_root, root_list, False)
+        self.aligned_head = accessor.set(self.aligned_head, head_list, False)
+        self.aligned_update = accessor.set(self.aligned_update, update_list,
+                                           False)
+
+        self._store_stats(list_unifier, key_path)
+
+    def _get_accessor(self, key_path):
+        try:
+            return self._accessors[key_path]
+        except KeyError:
+            accessor = self._accessors[key_path] = KeyPathAccessor(key_path)
+            return accessor
+
+    def _store_stats(self, list_unifier, key_path):
+        if self.collect_stats:
+            self.head_stats[key_path] = list_unifier.head_stats
+            self.update_stats[key_path] = list_unifier.update_stats
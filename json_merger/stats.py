@@ -24,9 +24,20 @@
 
 from __future__ import absolute_import, print_function
 
+from array import array
+
 
 class ListMatchStats(object):
-    """Class for holding list entity matching stats."""
+    """Class for holding list entity matching stats.
+
+    The stats are filled in while the lists are matched and then finalized.
+    From then on they can no longer change and the derived indices are
+    computed only once, on their first access. The lists and dicts of
+    elements are built anew on every access.
+    """
+
+    __slots__ = ('lst', 'root', '_in_result', '_root_match', '_finalized',
+                 '_cache')
 
     def __init__(self, lst, root):
         """
@@ -65,57 +76,107 @@ class ListMatchStats(object):
         self.lst = lst
         self.root = root
 
-        self.in_result_idx = set()
-        self.not_in_result_root_match_idx = set()
-        self.root_matches = {}
+        # Flag for each element of lst telling if it is in the result.
+        self._in_result = bytearray(len(lst))
+        # Index of the root match of each element of lst or -1.
+        self._root_match = array('l', [-1]) * len(lst)
+        self._finalized = False
+        self._cache = {}
+
+    def _check_not_finalized(self):
+        if self._finalized:
+            raise ValueError('Finalized stats can not be changed')
 
     def move_to_result(self, lst_idx):
         """Moves element from lst available at lst_idx."""
-        self.in_result_idx.add(lst_idx)
-
-        if lst_idx in self.not_in_result_root_match_idx:
-            self.not_in_result_root_match_idx.remove(lst_idx)
+        self._check_not_finalized()
+        self._in_result[lst_idx] = 1
 
     def add_root_match(self, lst_idx, root_idx):
         """Adds a match for the elements avaialble at lst_idx and root_idx."""
-        self.root_matches[lst_idx] = root_idx
-        if lst_idx in self.in_result_idx:
-            return
+        self._check_not_finalized()
+        self._root_match[lst_idx] = root_idx
+
+    def finalize(self):
+        """Freezes the stats so that the derived views can be cached."""
+        self._finalized = True
+        return self
+
+    def _cached(self, name, compute):
+        if not self._finalized:
+            return compute()
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
 
-        self.not_in_result_root_match_idx.add(lst_idx)
+    @property
+    def root_matches(self):
+        return dict(self._cached('root_matches', lambda: tuple(
+            (idx, root_idx) for idx, root_idx in enumerate(self._root_match)
+            if root_idx >= 0)))
+
+    @property
+    def in_result_idx(self):
+        return self._cached('in_result_idx', lambda: frozenset(
+            idx for idx, flag in enumerate(self._in_result) if flag))
 
     @property
     def not_in_result_idx(self):
-        return set(range(len(self.lst))).difference(self.in_result_idx)
+        return self._cached('not_in_result_idx', lambda: frozenset(
+            idx for idx, flag in enumerate(self._in_result) if not flag))
+
+    @property
+    def not_in_result_root_match_idx(self):
+        return self._cached('not_in_result_root_match_idx', lambda: frozenset(
+            idx for idx in self.not_in_result_idx
+            if self._root_match[idx] >= 0))
 
     @property
     def not_in_result_not_root_match_idx(self):
-        return self.not_in_result_idx.difference(
-            self.not_in_result_root_match_idx)
+        return self._cached(
+            'not_in_result_not_root_match_idx',
+            lambda: self.not_in_result_idx.difference(
+                self.not_in_result_root_match_idx))
+
+    def _sorted(self, name, indices):
+        return self._cached(name + '_sorted', lambda: tuple(sorted(indices)))
+
+    def _objects(self, name, indices):
+        return [self.lst[e] for e in self._sorted(name, indices)]
 
     @property
     def in_result(self):
-        return [self.lst[e] for e in self.in_result_idx]
+        return self._objects('in_result_idx', self.in_result_idx)
 
     @property
     def not_in_result(self):
-        return [self.lst[e] for e in self.not_in_result_idx]
+        return self._objects('not_in_result_idx', self.not_in_result_idx)
 
     @property
     def not_in_result_root_match(self):
-        return [self.lst[e] for e in self.not_in_result_root_match_idx]
+        return self._objects('not_in_result_root_match_idx',
+                             self.not_in_result_root_match_idx)
 
     @property
     def not_in_result_not_root_match(self):
-        return [self.lst[e] for e in self.not_in_result_not_root_match_idx]
+        return self._objects('not_in_result_not_root_match_idx',
+                             self.not_in_result_not_root_match_idx)
 
     @property
     def not_in_result_root_match_pairs(self):
-        return [(self.lst[e], self.root[self.root_matches[e]])
-                for e in self.not_in_result_root_match_idx]
+        return [(self.lst[e], self.root[self._root_match[e]])
+                for e in self._sorted('not_in_result_root_match_idx',
+                                      self.not_in_result_root_match_idx)]
 
     @property
     def not_matched_root_objects(self):
-        matched_root_idx = set(self.root_matches.values())
-        return [o for idx, o in enumerate(self.root)
-                if idx not in matched_root_idx]
+        def compute():
+            matched = bytearray(len(self.root))
+            for root_idx in self._root_match:
+                if root_idx >= 0:
+                    matched[root_idx] = 1
+            return tuple(idx for idx in range(len(self.root))
+                         if not matched[idx])
+
+        return [self.root[idx]
+                for idx in self._cached('not_matched_root_idx', compute)]
@@ -24,6 +24,8 @@
 
 from __future__ import absolute_import, print_function
 
+import six
+
 from .nothing import NOTHING
 
 
@@ -54,7 +56,7 @@ def _set_obj_at_key_path(obj, key_path, value):
 
     # Try to get the parent of the object to be set.
     parent = get_obj_at_key_path(obj, key_path[:-1], NOTHING)
-    if parent == NOTHING:
+    if parent is NOTHING:
         raise KeyError(key_path)
     try:
         parent[key_path[-1]] = value
@@ -65,7 +67,7 @@ def _set_obj_at_key_path(obj, key_path, value):
 
 def del_obj_at_key_path(obj, key_path, raise_key_error=True):
     obj = get_obj_at_key_path(obj, key_path[:-1], NOTHING)
-    if obj != NOTHING:
+    if obj is not NOTHING:
         try:
             del obj[key_path[-1]]
         except (KeyError, IndexError, TypeError):
@@ -75,6 +77,223 @@ def del_obj_at_key_path(obj, key_path, raise_key_error=True):
         raise KeyError(key_path)
 
 
+class KeyPathAccessor(object):
+    """Getter, setter and deleter compiled for a fixed key path.
+
+    It behaves like :func:`get_obj_at_key_path`, :func:`set_obj_at_key_path`
+    and :func:`del_obj_at_key_path`, but splits the path into the parent
+    path and the last key only once, so it is cheaper to reuse it on many
+    objects sharing the same structure.
+    """
+
+    __slots__ = ('key_path', '_parent_path', '_key')
+
+    def __init__(self, key_path):
+        self.key_path = tuple(key_path)
+        self._parent_path = self.key_path[:-1]
+        self._key = self.key_path[-1] if self.key_path else None
+
+    def get(self, obj, default=None):
+        parent = self.get_parent(obj)
+        if parent is NOTHING:
+            return default
+        if not self.key_path:
+            return parent
+        try:
+            return parent[self._key]
+        except (KeyError, IndexError, TypeError):
+            return default
+
+    def get_parent(self, obj):
+        """Returns the parent of the value or NOTHING if it is missing."""
+        current = obj
+        for k in self._parent_path:
+            try:
+                current = current[k]
+            except (KeyError, IndexError, TypeError):
+                return NOTHING
+        return current
+
+    def set(self, obj, value, raise_key_error=True):
+        if not self.key_path:
+            return value
+        parent = self.get_parent(obj)
+        try:
+            if parent is NOTHING:
+                raise KeyError(self._key)
+            parent[self._key] = value
+        except (KeyError, IndexError, TypeError):
+            if raise_key_error:
+                raise KeyError(self.key_path)
+        return obj
+
+    def delete(self, obj, raise_key_error=True):
+        parent = self.get_parent(obj)
+        try:
+            if parent is NOTHING:
+                raise KeyError(self._key)
+            del parent[self._key]
+        except (KeyError, IndexError, TypeError):
+            if raise_key_error:
+                raise KeyError(self.key_path)
+
+
+# Trie node key marking that a path ends at that node.
+_PATH_END = object()
+
+
+def _build_key_path_trie(key_paths):
+    trie = {}
+    for key_path in key_paths:
+        node = trie
+        for key in key_path:
+            child = node.get(key)
+            if child is None:
+                child = node[key] = {}
+            node = child
+        node[_PATH_END] = tuple(key_path)
+    return trie
+
+
+def _iter_trie_paths(node):
+    for key, child in six.iteritems(node):
+        if key is _PATH_END:
+            yield child
+        else:
+            for key_path in _iter_trie_paths(child):
+                yield key_path
+
+
+def _get_in_trie(current, node, result, default):
+    for key, child in six.iteritems(node):
+        if key is _PATH_END:
+            result[child] = current
+            continue
+        try:
+            value = current[key]
+        except (KeyError, IndexError, TypeError):
+            for key_path in _iter_trie_paths(child):
+                result[key_path] = default
+        else:
+            _get_in_trie(value, child, result, default)
+
+
+def _apply_in_trie(current, node, action, missing):
+    for key, child in six.iteritems(node):
+        if key is _PATH_END:
+            continue
+        leaf_path = child.get(_PATH_END)
+        if len(child) > (0 if leaf_path is None else 1):
+            # Handle the longer paths before changing the value at key.
+            try:
+                value = current[key]
+            except (KeyError, IndexError, TypeError):
+                missing.extend(key_path for key_path in _iter_trie_paths(child)
+                               if key_path is not leaf_path)
+            else:
+                _apply_in_trie(value, child, action, missing)
+        if leaf_path is not None:
+            try:
+                action(current, key, leaf_path)
+            except (KeyError, IndexError, TypeError):
+                missing.append(leaf_path)
+
+
+def get_objs_at_key_paths(obj, key_paths, default=None):
+    """Batched :func:`get_obj_at_key_path`.
+
+    Every key path prefix shared by more paths is walked only once.
+
+    Returns:
+        A dict mapping each key path, as a tuple, to the value found at it
+        or to ``default`` if it is missing.
+    """
+    result = {}
+    _get_in_trie(obj, _build_key_path_trie(key_paths), result, default)
+    return result
+
+
+def set_objs_at_key_paths(obj, values, raise_key_error=True):
+    """Batched :func:`set_obj_at_key_path`.
+
+    Args:
+        obj: The object in which the values are set.
+
+        values: A dict mapping key paths to the values to set at them.
+
+        raise_key_error: Whether to raise a ``KeyError`` if the parent of a
+            key path is missing. The values having a parent are set anyway.
+
+    Returns:
+        The updated object.
+    """
+    def _set(parent, key, key_path):
+        parent[key] = values[key_path]
+
+    missing = []
+    trie = _build_key_path_trie(values)
+    _apply_in_trie(obj, trie, _set, missing)
+    if missing and raise_key_error:
+        raise KeyError(missing[0])
+    if _PATH_END in trie:
+        return values[trie[_PATH_END]]
+    return obj
+
+
+def del_objs_at_key_paths(obj, key_paths, raise_key_error=True):
+    """Batched :func:`del_obj_at_key_path`."""
+    def _del(parent, key, key_path):
+        del parent[key]
+
+    missing = []
+    _apply_in_trie(obj, _build_key_path_trie(key_paths), _del, missing)
+    if missing and raise_key_error:
+        raise KeyError(missing[0])
+
+
+def get_list_fields(obj):
+    """Returns the key paths of the lists in obj, as tuples.
+
+    The lists are not searched for other lists. If obj is a list, the only
+    key path is the empty one.
+    """
+    result = []
+    _add_list_fields(obj, result, ())
+    return result
+
+
+def _add_list_fields(obj, result, key_path):
+    if isinstance(obj, list):
+        result.append(key_path)
+    elif isinstance(obj, dict):
+        for key, value in six.iteritems(obj):
+            _add_list_fields(value, result, key_path + (key, ))
+
+
+def without_objs_at_key_paths(obj, key_paths):
+    """Returns a copy of obj without the values at the given key paths.
+
+    Only the dicts on the way to the removed values are copied, the other
+    values are shared with obj, which is left untouched. The missing key
+    paths are ignored.
+    """
+    return _copy_without_in_trie(obj, _build_key_path_trie(key_paths))
+
+
+def _copy_without_in_trie(current, node):
+    if not isinstance(current, dict):
+        return current
+    new = dict(current)
+    for key, child in six.iteritems(node):
+        if key is _PATH_END or key not in current:
+            continue
+        if _PATH_END in child:
+            del new[key]
+        else:
+            new[key] = _copy_without_in_trie(current[key], child)
+    return new
+
+
 def has_prefix(key_path, prefix):
     return len(prefix) <= len(key_path) and key_path[:len(prefix)] == prefix
 
@@ -90,6 +309,152 @@ def get_dotted_key_path(key_path, filter_int_keys=False):
                     if not isinstance(k, int) and filter_int_keys)
 
 
+class KeyPath(object):
+    """Interned path towards a value inside a JSON object.
+
+    A path only keeps a pointer to its parent and its last key, so building
+    the path of a child is constant time. Children are interned, so walking
+    the same key twice from a path returns the same object and the tuple and
+    dotted forms are computed at most once per path.
+
+    Example:
+        >>> root = KeyPath()
+        >>> path = root.extend(('authors', 0, 'name'))
+        >>> path.tuple
+        ('authors', 0, 'name')
+        >>> path.dotted
+        'authors.name'
+        >>> path is root.child('authors').child(0).child('name')
+        True
+    """
+
+    __slots__ = ('parent', 'key', '_children', '_tuple', '_dotted')
+
+    def __init__(self, parent=None, key=None):
+        self.parent = parent
+        self.key = key
+        self._children = {}
+        self._tuple = () if parent is None else None
+        self._dotted = '' if parent is None else None
+
+    def child(self, key):
+        """Returns the path of the value found under ``key``."""
+        try:
+            return self._children[key]
+        except KeyError:
+            child = self._children[key] = KeyPath(self, key)
+            return child
+
+    def extend(self, keys):
+        """Returns the path obtained by walking ``keys`` from this one."""
+        path = self
+        for key in keys:
+            path = path.child(key)
+        return path
+
+    @property
+    def tuple(self):
+        """The keys of the path as a tuple."""
+        if self._tuple is None:
+            self._tuple = self.parent.tuple + (self.key, )
+        return self._tuple
+
+    @property
+    def dotted(self):
+        """The path as a config string, ignoring the list indexes."""
+        if self._dotted is None:
+            parent_dotted = self.parent.dotted
+            if isinstance(self.key, int):
+                self._dotted = parent_dotted
+            elif parent_dotted:
+                self._dotted = parent_dotted + '.' + self.key
+            else:
+                self._dotted = self.key
+        return self._dotted
+
+    def __iter__(self):
+        return iter(self.tuple)
+
+    def __len__(self):
+        return len(self.tuple)
+
+    def __repr__(self):
+        return 'KeyPath(%r)' % (self.tuple, )
+
+
+class ConfigTrie(object):
+    """Prefix tree of config strings.
+
+    Each node stands for a config string prefix and knows whether the prefix
+    is itself in the config. Looking up the config relative to a key path
+    descends one node per component, and the resulting sub-trie is shared
+    with the parent instead of being copied.
+
+    Example:
+        >>> trie = ConfigTrie(['a.b', 'a.c.d', 'e'])
+        >>> sub_trie = trie.at(('a', 0))
+        >>> sorted(sub_trie)
+        ['b', 'c.d']
+        >>> 'c.d' in sub_trie, 'c' in sub_trie
+        (True, False)
+        >>> sub_trie is trie.at(('a', ))
+        True
+    """
+
+    __slots__ = ('_children', 'terminal')
+
+    def __init__(self, conf_set=()):
+        self._children = {}
+        self.terminal = False
+        for conf in conf_set:
+            self.add(conf)
+
+    @classmethod
+    def build(cls, conf):
+        """Returns ``conf`` if it is a trie, otherwise a trie built from it."""
+        if isinstance(conf, cls):
+            return conf
+        return cls(conf or ())
+
+    def add(self, conf):
+        node = self
+        if conf:
+            for part in conf.split('.'):
+                try:
+                    node = node._children[part]
+                except KeyError:
+                    child = node._children[part] = ConfigTrie()
+                    node = child
+        node.terminal = True
+
+    def at(self, key_path):
+        """Returns the sub-trie for ``key_path``, ignoring list indexes."""
+        node = self
+        for key in key_path:
+            if isinstance(key, int):
+                continue
+            node = node._children.get(key, _EMPTY_CONFIG_TRIE)
+        return node
+
+    def __contains__(self, conf):
+        return self.at(conf.split('.') if conf else ()).terminal
+
+    def __iter__(self):
+        if self.terminal:
+            yield ''
+        for part, child in six.iteritems(self._children):
+            for conf in child:
+                yield part + '.' + conf if conf else part
+
+    def __bool__(self):
+        return self.terminal or bool(self._children)
+
+    __nonzero__ = __bool__
+
+
+_EMPTY_CONFIG_TRIE = ConfigTrie()
+
+
 def get_conf_set_for_key_path(conf_set, key_path):
     prefix = get_dotted_key_path(key_path, True)
     return set(remove_prefix(k, prefix).lstrip('.')
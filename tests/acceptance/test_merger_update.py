@@ -82,7 +82,7 @@ def _deserialize_conflict(conflict_type, path, body):
     return Conflict(conflict_type, tuple(path), body)
 
 
-@pytest.mark.parametrize('scenario', [
+AUTHOR_TYPO_SCENARIOS = [
     'author_typo_update_fix',
     'author_typo_curator_fix',
     'author_typo_update_and_curator_fix',
@@ -100,7 +100,10 @@ def _deserialize_conflict(conflict_type, path, body):
     'author_double_match_unambiguous_fix',
     'title_addition',
     'title_change'
-])
+]
+
+
+@pytest.mark.parametrize('scenario', AUTHOR_TYPO_SCENARIOS)
 def test_author_typo_scenarios(update_fixture_loader, scenario):
     root, head, update, exp, desc = update_fixture_loader.load_test(scenario)
     merger = Merger(root, head, update,
@@ -156,3 +159,23 @@ def test_author_deleted_in_update(update_fixture_loader):
                     list_merge_ops=list_config)
     merger.merge()
     assert merger.merged_root == exp, desc
+
+
+@pytest.mark.parametrize('scenario', AUTHOR_TYPO_SCENARIOS)
+def test_author_typo_scenarios_dry_run(update_fixture_loader, scenario):
+    root, head, update, exp, desc = update_fixture_loader.load_test(scenario)
+    merger = Merger(root, head, update,
+                    DictMergerOps.FALLBACK_KEEP_HEAD,
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+                    comparators=COMPARATORS,
+                    list_merge_ops=LIST_MERGE_OPS,
+                    dry_run=True)
+    expected_conflicts = [_deserialize_conflict(t, p, b)
+                          for t, p, b in exp.get('conflicts', [])]
+    try:
+        merger.merge()
+    except MergeError:
+        pass
+
+    assert set(merger.conflicts) == set(expected_conflicts), desc
+    assert merger.merged_root is None
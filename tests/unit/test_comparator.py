@@ -27,7 +27,10 @@
 
 from __future__ import absolute_import, print_function
 
-from json_merger.comparator import PrimaryKeyComparator
+from json_merger.comparator import (
+    BaseComparator, DefaultComparator, EqualityKeyComparator, KeyComparator,
+    PrimaryKeyComparator, keyed_comparator
+)
 
 
 def test_multiple_primary_keys():
@@ -89,3 +92,126 @@ def test_list_of_primary_keys_normalization():
 
     assert inst.get_matches('l1', 2) == [(2, lst2[2])]
     assert inst.get_matches('l2', 2) == [(2, lst1[2])]
+
+
+def test_matches_are_computed_lazily():
+    class CountingComparator(BaseComparator):
+        calls = []
+
+        def equal(self, obj1, obj2):
+            self.calls.append((obj1, obj2))
+            return obj1 == obj2
+
+    lst1 = [1, 2, 3]
+    lst2 = [3, 2, 1]
+    inst = CountingComparator(lst1, lst2)
+    assert not CountingComparator.calls
+
+    assert inst.get_matches('l1', 0) == [(2, 1)]
+    assert len(CountingComparator.calls) == 3
+
+    # The pair (0, 2) was already compared from the l1 side.
+    assert inst.get_matches('l2', 2) == [(0, 1)]
+    assert len(CountingComparator.calls) == 5
+
+    assert inst.matches == {(0, 2), (1, 1), (2, 0)}
+    assert len(CountingComparator.calls) == 9
+
+
+def test_process_lists_override_is_used():
+    class CustomComparator(BaseComparator):
+        def process_lists(self):
+            self.matches.add((0, 1))
+
+    inst = CustomComparator(['foo', 'bar'], ['bar', 'foo'])
+    assert inst.get_matches('l1', 0) == [(1, 'foo')]
+    assert inst.get_matches('l2', 0) == []
+
+
+def test_get_matches_does_not_scan_the_matches():
+    class CountingSet(set):
+        lookups = 0
+
+        def __contains__(self, item):
+            CountingSet.lookups += 1
+            return super(CountingSet, self).__contains__(item)
+
+    class CustomComparator(BaseComparator):
+        def process_lists(self):
+            self.matches = CountingSet([(0, 1), (2, 1), (1, 0)])
+
+    inst = CustomComparator(['a', 'b', 'c'], ['b', 'a'])
+
+    assert inst.get_matches('l1', 0) == [(1, 'a')]
+    assert inst.get_matches('l2', 1) == [(0, 'a'), (2, 'c')]
+    assert inst.get_matches('l1', 1) == [(0, 'b')]
+    assert inst.get_matches('l2', 0) == [(1, 'b')]
+    assert inst.get_matches('l1', 3) == []
+    assert CountingSet.lookups == 0
+
+    inst.matches = {(1, 1)}
+    assert inst.get_matches('l1', 1) == [(1, 'a')]
+    assert inst.get_matches('l1', 0) == []
+
+
+def test_key_comparator():
+    class MyComp(KeyComparator):
+        def get_key(self, obj):
+            return obj.get('id')
+
+    lst1 = [{'id': 0}, {'id': 1}, {}]
+    lst2 = [{'id': 1, 'data': 1}, {}, {'id': 0}, {'id': 1}]
+    inst = MyComp(lst1, lst2)
+
+    assert inst.matches == {(0, 2), (1, 0), (1, 3)}
+    assert inst.get_matches('l1', 1) == [(0, lst2[0]), (3, lst2[3])]
+    assert inst.get_matches('l2', 1) == []
+    assert inst.equal(lst1[0], lst2[2])
+    assert not inst.equal(lst1[2], lst2[1])
+
+
+def test_key_comparator_default_key():
+    lst1 = [{'a': [1, 2]}, {'a': [2, 1]}]
+    lst2 = [{'a': [2, 1]}]
+    inst = KeyComparator(lst1, lst2)
+
+    assert inst.matches == {(1, 0)}
+
+
+def test_default_comparator_matches_null_entities():
+    inst = DefaultComparator([None, {'a': [1]}], [{'a': [1]}, None])
+
+    assert inst.matches == {(0, 1), (1, 0)}
+
+
+def test_equality_key_comparator():
+    lst1 = [None, {'a': [1]}, {'a': [2]}, 1]
+    lst2 = [{'a': [1]}, None, 1.0, {'a': [1]}]
+
+    inst = EqualityKeyComparator(lst1, lst2)
+
+    assert inst.matches == DefaultComparator(lst1, lst2).matches == {
+        (0, 1), (1, 0), (1, 3), (3, 2)}
+    assert keyed_comparator(DefaultComparator)(lst1, lst2).matches == (
+        inst.matches)
+
+
+def test_keyed_primary_key_comparator():
+    class MyComp(PrimaryKeyComparator):
+        primary_key_fields = ['id', ['id1', 'id2']]
+        normalization_functions = {'id2': str.lower}
+
+    lst1 = [{'id': 0, 'data': 1}, {'id1': 0, 'id2': 'A'}, {'id2': 'b'},
+            {'data': 1}, {'data': 2}, {'id': 1, 'id1': 1}]
+    lst2 = [{'id': 0, 'data': 2}, {'id1': 0, 'id2': 'a'}, {'id2': 'B'},
+            {'id1': 0}, {'data': 1}, {'data': 3}, {'id1': 1}]
+
+    keyed = keyed_comparator(MyComp)(lst1, lst2)
+
+    assert keyed.matches == MyComp(lst1, lst2).matches == {
+        (0, 0), (1, 1), (2, 2), (3, 4), (5, 6)}
+
+
+def test_keyed_comparator_without_keys():
+    assert keyed_comparator(KeyComparator) is KeyComparator
+    assert keyed_comparator(BaseComparator) is None
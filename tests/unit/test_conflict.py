@@ -26,9 +26,14 @@
 
 from __future__ import absolute_import, print_function
 
+import io
 import json
 
-from json_merger.conflict import Conflict
+import pytest
+
+from json_merger.conflict import (
+    Conflict, ConflictSink, conflicts_to_json_patch
+)
 
 
 def test_to_json_with_reorder():
@@ -118,3 +123,97 @@ def test_to_json_when_path_has_integers():
             'value': None
         }
     ]
+
+
+def test_with_prefix_reuses_frozen_body():
+    body = (None, {'name': 'John'}, {'name': 'Johnny'})
+    conflict = Conflict('MANUAL_MERGE', (0, ), body)
+
+    prefixed = conflict.with_prefix(('authors', ))
+
+    assert prefixed == Conflict('MANUAL_MERGE', ('authors', 0), body)
+    assert prefixed.frozen_body is conflict.frozen_body
+    assert conflict.with_prefix(()) is conflict
+
+
+def test_body_is_a_copy():
+    conflict = Conflict('SET_FIELD', ('foo', ), {'bar': [1, 2]})
+
+    conflict.body['bar'].append(3)
+
+    assert conflict.body == {'bar': [1, 2]}
+    assert conflict.body is not conflict.body
+    with pytest.raises(TypeError):
+        conflict.frozen_body['bar'] = []
+
+
+def test_json_patch_values_are_not_shared():
+    conflict = Conflict('SET_FIELD', ('foo', ), {'bar': [1, 2]})
+
+    conflicts_to_json_patch([conflict])[0]['value']['bar'].append(3)
+
+    assert conflicts_to_json_patch([conflict])[0]['value'] == {
+        'bar': [1, 2]}
+    assert conflict.body == {'bar': [1, 2]}
+
+
+def test_conflicts_to_json_patch():
+    conflicts = [
+        Conflict('SET_FIELD', ('foo', 'a/b~c'), 1),
+        Conflict('ADD_BACK_TO_HEAD', ('foo', 'a/b~c'), [2, 3]),
+        Conflict('REMOVE_FIELD', ('bar', ), None),
+    ]
+
+    patch = conflicts_to_json_patch(conflicts)
+
+    assert patch == [
+        {'$type': 'SET_FIELD', 'op': 'replace',
+         'path': '/foo/a~1b~0c', 'value': 1},
+        {'$type': 'ADD_BACK_TO_HEAD', 'op': 'add',
+         'path': '/foo/a~1b~0c/-', 'value': 2},
+        {'$type': 'ADD_BACK_TO_HEAD', 'op': 'add',
+         'path': '/foo/a~1b~0c/-', 'value': 3},
+        {'$type': 'REMOVE_FIELD', 'op': 'remove',
+         'path': '/bar', 'value': None},
+    ]
+    assert patch[1]['path'] is patch[2]['path']
+
+
+def test_conflicts_to_json_patch_stream():
+    conflicts = [
+        Conflict('SET_FIELD', ('foo', ), {'bar': 1}),
+        Conflict('INSERT', ('baz', 0), 'qux'),
+    ]
+    stream = io.StringIO()
+
+    assert conflicts_to_json_patch(conflicts, stream=stream) is None
+    assert json.loads(stream.getvalue()) == conflicts_to_json_patch(
+        conflicts)
+
+
+def test_conflicts_to_json_patch_stream_custom_dumps():
+    stream = io.StringIO()
+
+    conflicts_to_json_patch([], stream=stream)
+    assert stream.getvalue() == u'[]'
+
+    stream = io.StringIO()
+    conflicts_to_json_patch([Conflict('REORDER', ('foo', ), [1])],
+                            stream=stream,
+                            dumps=lambda op: json.dumps(op['value']))
+    assert stream.getvalue() == u'[1]'
+
+
+def test_conflict_sink_prefixes_shared_conflicts():
+    sink = ConflictSink()
+    child = sink.at(('authors', 0))
+
+    sink.add(Conflict('SET_FIELD', ('title', ), 'Foo'))
+    child.at(('name', )).extend([Conflict('REMOVE_FIELD', (), None)])
+
+    assert child.conflicts is sink.conflicts
+    assert len(sink) == 2
+    assert sink.conflicts == [
+        Conflict('SET_FIELD', ('title', ), 'Foo'),
+        Conflict('REMOVE_FIELD', ('authors', 0, 'name'), None),
+    ]
@@ -27,9 +27,38 @@
 
 from __future__ import absolute_import, print_function
 
-from json_merger.contrib.inspirehep.author_util import (NameInitial,
-                                                        NameToken,
-                                                        simple_tokenize)
+import random
+import threading
+import time
+
+import pytest
+
+from json_merger.config import UnifierOps
+from json_merger.conflict import ConflictSink, ConflictType
+from json_merger.contrib.inspirehep import assignment, match
+from json_merger.contrib.inspirehep.author_util import (
+    AuthorNameCandidates, AuthorNameDistanceCalculator, AuthorNameIndex,
+    AuthorNameNormalizer, LRUCache, NameInitial, NameToken, simple_tokenize,
+    tokenize_name
+)
+from json_merger.contrib.inspirehep.comparators import (
+    DistanceFunctionComparator, ReferenceComparator
+)
+from json_merger.contrib.inspirehep.match import (
+    blocking_candidates, distance_function_match
+)
+from json_merger.contrib.inspirehep.reference_util import (
+    ReferenceTitleDistanceCalculator, get_reference_identifiers,
+    normalize_arxiv_eprint, normalize_doi
+)
+from json_merger.errors import TimeBudgetExceededError
+from json_merger.list_unify import ListUnifier
+from json_merger.nothing import NOTHING
+
+AUTHORS_1 = [{'full_name': u'Smith, John'}, {'full_name': u'Dœ, J.'},
+             {'full_name': u'Ellis, John R.'}, {'full_name': u'Nobody, A.'}]
+AUTHORS_2 = [{'full_name': u'Doe, John'}, {'full_name': u'Smith, J.'},
+             {'full_name': u'Elis, J. R.'}, {'full_name': u'Ellis, Jonathan'}]
 
 
 def test_simple_tokenize_handles_unicode():
@@ -42,3 +71,491 @@ def test_simple_tokenize_handles_unicode():
     }
 
     assert result == expected
+
+
+def test_author_name_distance_on_features():
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+
+    for a1 in AUTHORS_1:
+        for a2 in AUTHORS_2:
+            features = dist.get_features(a1), dist.get_features(a2)
+            assert dist.distance(*features) == dist(a1, a2)
+    assert dist.get_features({}) is None
+    assert dist.distance(None, dist.get_features(AUTHORS_1[0])) == 1.0
+    assert dist.get_features({'full_name': u'Dœ, J.'}) == (
+        (NameToken(u'doe'), NameInitial(u'j')), (False, True))
+
+
+def test_distance_function_match_with_features():
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+    norm_funcs = [AuthorNameNormalizer(simple_tokenize),
+                  AuthorNameNormalizer(simple_tokenize, 1, True)]
+    calls = []
+
+    def get_features(author):
+        calls.append(author)
+        return dist.get_features(author)
+
+    expected = distance_function_match(AUTHORS_1, AUTHORS_2, 0.12, dist,
+                                       norm_funcs)
+    result = distance_function_match(AUTHORS_1, AUTHORS_2, 0.12,
+                                     dist.distance, norm_funcs, get_features)
+
+    assert sorted(result) == sorted(expected)
+    assert sorted(expected) == [(0, 1), (1, 0), (2, 2)]
+    assert len(calls) == len(AUTHORS_1) + len(AUTHORS_2)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+
+    assert cache.get('a', lambda k: k.upper()) == 'A'
+    assert cache.get('b', lambda k: k.upper()) == 'B'
+    assert cache.get('a', lambda k: 'missed') == 'A'
+    assert cache.get('c', lambda k: k.upper()) == 'C'
+    assert cache.get('b', lambda k: 'missed') == 'missed'
+    assert (cache.hits, cache.misses) == (1, 4)
+
+    cache.resize(1)
+    assert len(cache) == 1
+    assert cache.get('b', lambda k: 'missed again') == 'missed'
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_lru_cache_from_threads():
+    cache = LRUCache(maxsize=50)
+
+    def worker():
+        for i in range(1000):
+            assert cache.get(i % 100, lambda k: k * 2) == (i % 100) * 2
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 50
+    assert cache.hits + cache.misses == 4000
+
+
+def test_name_cache_shared_by_normalizer_and_distance():
+    cache = LRUCache()
+    dist = AuthorNameDistanceCalculator(simple_tokenize, cache=cache)
+    normalizer = AuthorNameNormalizer(simple_tokenize, asciify=True,
+                                      cache=cache)
+    author = {'full_name': u'Dœ, John'}
+
+    assert normalizer(author) == (u'doe', u'john')
+    assert normalizer(author) == (u'doe', u'john')
+    assert cache.hits == 1
+    dist.get_features(author)
+    assert cache.hits == 2
+    assert tokenize_name(u'Dœ, John', simple_tokenize, True, cache) == {
+        'lastnames': [NameToken(u'doe')],
+        'nonlastnames': [NameToken(u'john')],
+    }
+    assert cache.hits == 3
+
+
+def _random_cost_matrices(count, max_size):
+    rand = random.Random(42)
+    for _ in range(count):
+        rows = rand.randint(1, max_size)
+        cols = rand.randint(1, max_size)
+        yield [[rand.choice([0.0, 0.1, 0.5, 1.0, rand.random()])
+                for _ in range(cols)] for _ in range(rows)]
+
+
+def _assignment_cost(matrix, pairs):
+    return round(sum(matrix[i][j] for i, j in pairs), 9)
+
+
+def test_jv_assignment_is_optimal():
+    for matrix in _random_cost_matrices(300, 9):
+        expected = assignment.munkres_assignment(matrix)
+        result = assignment.jv_assignment(matrix, use_numpy=False)
+
+        assert len(result) == min(len(matrix), len(matrix[0]))
+        assert len(set(j for _, j in result)) == len(result)
+        assert (_assignment_cost(matrix, result) ==
+                _assignment_cost(matrix, expected))
+
+
+def test_jv_assignment_numpy_matches_pure_python():
+    if assignment.numpy is None:
+        pytest.skip('NumPy is not installed')
+
+    for matrix in _random_cost_matrices(100, 12):
+        assert (assignment.jv_assignment(matrix, use_numpy=True) ==
+                assignment.jv_assignment(matrix, use_numpy=False))
+
+
+def test_linear_assignment_keeps_munkres_ties_on_small_matrices():
+    assert assignment.linear_assignment([]) == []
+    assert assignment.linear_assignment([[0.5], [0.5], [0.5], [1.0]]) == (
+        assignment.munkres_assignment([[0.5], [0.5], [0.5], [1.0]]))
+
+    for matrix in _random_cost_matrices(500, 4):
+        if len(matrix) * len(matrix[0]) < assignment.SMALL_MATRIX_SIZE:
+            assert (assignment.linear_assignment(matrix) ==
+                    assignment.munkres_assignment(matrix))
+
+
+def _last_name_keys(author):
+    return [author['full_name'][:1].lower()]
+
+
+def test_distance_function_match_with_candidates():
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+    calls = []
+
+    def counting_dist(a1, a2):
+        calls.append((a1, a2))
+        return dist(a1, a2)
+
+    expected = distance_function_match(AUTHORS_1, AUTHORS_2, 0.12, dist)
+    result = distance_function_match(
+        AUTHORS_1, AUTHORS_2, 0.12, counting_dist,
+        candidates_fn=blocking_candidates(_last_name_keys))
+
+    assert sorted(result) == sorted(expected) == [(0, 1), (1, 0), (2, 2)]
+    assert len(calls) == 4
+
+
+def test_blocking_candidates():
+    candidates_fn = blocking_candidates(lambda word: set(word))
+
+    assert list(candidates_fn(['ab', 'cd', 'x'], ['bc', 'a', 'y'])) == [
+        (0, 0), (0, 1), (1, 0)]
+
+
+def test_distance_function_comparator_with_candidates():
+    class AuthorComparator(DistanceFunctionComparator):
+        distance_function = AuthorNameDistanceCalculator(simple_tokenize)
+        threshold = 0.12
+        candidates_function = blocking_candidates(_last_name_keys)
+
+    comparator = AuthorComparator(AUTHORS_1, AUTHORS_2)
+
+    assert comparator.get_matches('l1', 0) == [(1, AUTHORS_2[1])]
+    assert comparator.get_matches('l2', 2) == [(2, AUTHORS_1[2])]
+    assert comparator.get_matches('l1', 3) == []
+
+
+def test_equal_dist_matches_numpy_matches_pure_python():
+    if match.numpy is None:
+        pytest.skip('NumPy is not installed')
+
+    for matrix in _random_cost_matrices(200, 30):
+        indices = assignment.linear_assignment(matrix)
+        assert (match._equal_dist_matches_numpy(matrix, indices, 0.5) ==
+                match._equal_dist_matches(matrix, indices, 0.5))
+    assert match._equal_dist_matches_numpy([[1.0]], [], 0.5) == set()
+
+
+def test_author_name_distance_with_max_distance():
+    rand = random.Random(7)
+    tokens = [u'smith', u'smyth', u'doe', u'do', u'ellis', u'elis', u'j.',
+              u'john', u'jon', u'r.', u'brian', u'bryan']
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+
+    def random_author():
+        last = rand.sample(tokens, rand.randint(1, 2))
+        first = rand.sample(tokens, rand.randint(1, 2))
+        full_name = u'{}, {}'.format(' '.join(last), ' '.join(first))
+        return {'full_name': full_name}
+
+    for _ in range(500):
+        a1, a2 = random_author(), random_author()
+        for max_distance in (0.0, 0.12, 0.3):
+            exact = dist(a1, a2)
+            bounded = dist(a1, a2, max_distance=max_distance)
+            if exact <= max_distance:
+                assert bounded == exact
+            else:
+                assert bounded > max_distance
+
+
+def test_author_name_index():
+    index = AuthorNameIndex(AUTHORS_2, simple_tokenize)
+
+    assert index.get({'full_name': u'Ellis, J.'}) == [3]
+    assert index.get({'full_name': u'Dœ, Jöhn'}) == [0]
+    assert index.get({'full_name': u'Smith-Jones, John'}) == []
+    assert index.get({'name': u'Smith, J.'}) == []
+
+
+def test_author_name_index_with_initials():
+    authors = [{'full_name': u'Smith, J.'}, {'full_name': u'Smith, A.'},
+               {'full_name': u'Smith,'}, {'full_name': u'Doe, John'}]
+    index = AuthorNameIndex(authors, simple_tokenize, use_initials=True)
+
+    assert index.get({'full_name': u'Smith, John'}) == [0, 2]
+    assert index.get({'full_name': u'Smith, Anna J.'}) == [0, 1, 2]
+    assert index.get({'full_name': u'Smith,'}) == [0, 1, 2]
+    assert index.get({'full_name': u'Doe, A.'}) == []
+
+
+def test_author_name_candidates_with_comparator():
+    rand = random.Random(3)
+    last_names = [u'Smith', u'Doe', u'Ellis', u'Müller', u'Nakamura',
+                  u'Rossi', u'Garcia', u'Novak']
+    first_names = [u'John', u'J.', u'Anna', u'A.', u'Peter', u'P. J.']
+    authors = [{'full_name': u'{}, {}'.format(rand.choice(last_names),
+                                              rand.choice(first_names))}
+               for _ in range(200)]
+
+    class AuthorComparator(DistanceFunctionComparator):
+        distance_function = AuthorNameDistanceCalculator(simple_tokenize)
+        threshold = 0.12
+
+    class IndexedAuthorComparator(DistanceFunctionComparator):
+        distance_function = AuthorNameDistanceCalculator(simple_tokenize)
+        threshold = 0.12
+        candidates_function = AuthorNameCandidates(simple_tokenize)
+
+    l1 = rand.sample(authors, 150)
+    l2 = rand.sample(authors, 150)
+    expected = AuthorComparator(l1, l2).matches
+
+    assert IndexedAuthorComparator(l1, l2).matches == expected
+
+
+def test_match_by_identifiers():
+    l1 = [{'id': 1}, {'id': 2}, {'id': 3}, {}]
+    l2 = [{'id': 2}, {'id': 1}, {'id': 2}, {}]
+
+    common, l1_only, l2_only = match._match_by_identifiers(
+        l1, l2, lambda x: [x['id']] if 'id' in x else [])
+
+    assert common == [({'id': 1}, {'id': 1})]
+    assert l1_only == [{'id': 2}, {'id': 3}, {}]
+    assert l2_only == [{'id': 2}, {'id': 2}, {}]
+
+
+def test_distance_function_comparator_with_identifiers():
+    class AuthorComparator(DistanceFunctionComparator):
+        distance_function = AuthorNameDistanceCalculator(simple_tokenize)
+        threshold = 0.12
+        identifier_fields = ['ids', 'record.$ref']
+
+    orcid = {'schema': 'ORCID', 'value': '0000-0002-1825-0097'}
+    l1 = [{'full_name': u'Smith, John', 'ids': [orcid]},
+          {'full_name': u'Smith, J.'},
+          {'full_name': u'Doe, J.', 'record': {'$ref': 'authors/1'}},
+          {'full_name': u'Ellis, John', 'record': {'$ref': 'authors/2'}}]
+    l2 = [{'full_name': u'Smith, Jane',
+           'record': {'$ref': 'authors/2'}},
+          {'full_name': u'Smyth, Johnny', 'ids': [dict(orcid)]},
+          {'full_name': u'Ellis, J.', 'record': {'$ref': 'authors/2'}},
+          {'full_name': u'Doe, John'}]
+
+    comparator = AuthorComparator(l1, l2)
+
+    # l1[3] shares its record with two authors, so it is matched by name.
+    assert comparator.matches == {(0, 1), (1, 0), (2, 3), (3, 2)}
+
+
+def test_reference_identifiers_are_normalized():
+    reference = {'reference': {
+        'dois': ['doi:10.1103/PhysRevD.86.010001'],
+        'arxiv_eprint': 'arXiv:1207.7214v2',
+        'publication_info': {'journal_title': 'Phys. Lett. B',
+                             'journal_volume': '716', 'page_start': '1'},
+    }}
+
+    assert normalize_doi('https://doi.org/10.1000/ABC') == '10.1000/abc'
+    assert normalize_arxiv_eprint('hep-th/9711200v3') == 'hep-th/9711200'
+    assert get_reference_identifiers(reference) == [
+        ('doi', '10.1103/physrevd.86.010001'),
+        ('arxiv', '1207.7214'),
+        ('pubnote', ('physlettb', '716', '1')),
+    ]
+    assert get_reference_identifiers({'reference': {
+        'publication_info': {'journal_title': 'Phys. Lett. B'}}}) == []
+
+
+def test_reference_title_distance():
+    dist = ReferenceTitleDistanceCalculator()
+    ref1 = {'reference': {'title': {'title': u'Observation of a new boson'}}}
+    ref2 = {'reference': {'title': {'title': u'Observation of a new  Boson.'}}}
+    ref3 = {'reference': {'title': {'title': u'Observation of a new bosun'}}}
+
+    assert dist(ref1, ref2) == 0.0
+    assert dist(ref1, ref3) == dist(ref1, ref3, max_distance=0.1) < 0.1
+    assert dist(ref1, {'reference': {}}) == 1.0
+
+
+def _synthetic_references(rand, count):
+    words = [u'{}{}'.format(rand.choice(u'bcdfghklmnprstvz'),
+                            u''.join(rand.choice(u'aeiourstln')
+                                     for _ in range(rand.randint(3, 8))))
+             for _ in range(400)]
+    references = []
+    for i in range(count):
+        content = {'title': {'title': u' '.join(rand.sample(words, 7))}}
+        kind = i % 4
+        if kind == 0:
+            content['dois'] = [u'10.1000/REF.{}'.format(i)]
+        elif kind == 1:
+            content['arxiv_eprint'] = u'1{:03d}.{:05d}'.format(i % 1000, i)
+        elif kind == 2:
+            content['publication_info'] = {
+                'journal_title': u'Phys. Rev. D', 'journal_volume': u'86',
+                'page_start': u'{}'.format(i)}
+        references.append({'reference': content})
+    return references
+
+
+def _perturbed_reference(rand, reference):
+    content = dict(reference['reference'])
+    if 'dois' in content:
+        content['dois'] = [u'doi:' + content['dois'][0].lower()]
+    if 'arxiv_eprint' in content:
+        content['arxiv_eprint'] = u'arXiv:{}v2'.format(
+            content['arxiv_eprint'])
+    if 'publication_info' in content:
+        content['publication_info'] = dict(content['publication_info'],
+                                           journal_title=u'Phys.Rev.D')
+    title = content['title']['title']
+    typo = rand.randrange(len(title))
+    content['title'] = {'title': title[:typo] + u'x' + title[typo + 1:]}
+    return {'reference': content}
+
+
+def test_reference_comparator_on_synthetic_references():
+    rand = random.Random(11)
+    l1 = _synthetic_references(rand, 2000)
+    order = list(range(len(l1)))
+    rand.shuffle(order)
+    l2 = [_perturbed_reference(rand, l1[i]) for i in order]
+    # References missing from the other list are not matched. They reuse
+    # some identifiers, which leaves those references to the title matching.
+    l1.extend(_synthetic_references(rand, 20))
+
+    # Unify the lists as the merger does, where most of the matches are
+    # looked up one element at a time.
+    conflicts = ConflictSink()
+    unifier = ListUnifier(l1, l1, l2,
+                          UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                          ReferenceComparator, conflict_sink=conflicts)
+    unifier.unify()
+
+    expected = [(l1[i], l1[i], l2_elem)
+                for l2_elem, i in zip(l2, order)]
+    expected.extend((ref, ref, NOTHING) for ref in l1[len(order):])
+    assert sorted(unifier.unified, key=repr) == sorted(expected, key=repr)
+    assert [c.conflict_type for c in conflicts.conflicts] == [
+        ConflictType.REORDER]
+
+
+def test_bipartite_connected_components():
+    components = match.BipartiteConnectedComponents(2, 2)
+    for p1_node, p2_node in [(0, 1), (3, 1), (1, 0), (5, 7), (0, 4)]:
+        components.add_edge(p1_node, p2_node)
+
+    assert list(components.get_connected_components()) == [
+        ([0, 3], [1, 4]), ([1], [0]), ([5], [7])]
+
+
+def _components_by_search(edges):
+    neighbours = {}
+    for p1_node, p2_node in edges:
+        neighbours.setdefault((1, p1_node), set()).add((2, p2_node))
+        neighbours.setdefault((2, p2_node), set()).add((1, p1_node))
+    seen = set()
+    components = set()
+    for start in neighbours:
+        if start in seen:
+            continue
+        seen.add(start)
+        stack = [start]
+        component = set()
+        while stack:
+            node = stack.pop()
+            component.add(node)
+            for other in neighbours[node] - seen:
+                seen.add(other)
+                stack.append(other)
+        components.add(frozenset(component))
+    return components
+
+
+def test_bipartite_connected_components_on_random_graphs():
+    rand = random.Random(5)
+    for _ in range(20):
+        edges = [(rand.randrange(50), rand.randrange(50))
+                 for _ in range(rand.randint(0, 60))]
+        components = match.BipartiteConnectedComponents()
+        for p1_node, p2_node in edges:
+            components.add_edge(p1_node, p2_node)
+
+        result = set()
+        for p1_nodes, p2_nodes in components.get_connected_components():
+            assert p1_nodes == sorted(p1_nodes)
+            assert p2_nodes == sorted(p2_nodes)
+            result.add(frozenset([(1, n) for n in p1_nodes] +
+                                 [(2, n) for n in p2_nodes]))
+        assert result == _components_by_search(edges)
+
+
+def test_distance_function_match_deadline():
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+    rows = []
+
+    def counting_dist(a1, a2):
+        if a2 is AUTHORS_2[0]:
+            rows.append(a1)
+        return dist(a1, a2)
+
+    with pytest.raises(TimeBudgetExceededError):
+        distance_function_match(AUTHORS_1, AUTHORS_2, 0.12, counting_dist,
+                                deadline=time.time() - 1)
+    assert rows == []
+
+
+def test_distance_function_comparator_deadline():
+    class AuthorComparator(DistanceFunctionComparator):
+        distance_function = AuthorNameDistanceCalculator(simple_tokenize)
+        threshold = 0.12
+
+    comparator = AuthorComparator(AUTHORS_1, AUTHORS_2)
+    comparator.deadline = time.time() - 1
+
+    with pytest.raises(TimeBudgetExceededError):
+        comparator.get_matches('l1', 0)
+
+
+def test_bounded_distance_keeps_the_matches():
+    dist = AuthorNameDistanceCalculator(simple_tokenize)
+
+    def exact_distance(a1, a2):
+        return dist(a1, a2)
+
+    class BoundedComparator(DistanceFunctionComparator):
+        distance_function = dist
+        threshold = 0.3
+
+    class ExactComparator(DistanceFunctionComparator):
+        distance_function = exact_distance
+        threshold = 0.3
+
+    # The assignment depends on the distances greater than the threshold.
+    cases = [
+        ([u'dcbb, Aba', u'Bd, Bb', u'bb, A.', u'eabec, A'],
+         [u'Daee, A.', u'ab, Aaa', u'dea, Ab', u'Aeacc, A.', u'bb, A.'],
+         {(2, 4), (3, 0), (3, 3)}),
+        ([u'baeadd, Bb', u'beadc, B.', u'Aad, A.'],
+         [u'Eb, B.', u'abceca, A.', u'Cbe, A', u'Aead, A', u'baeadd, Bb'],
+         {(0, 4), (2, 1), (2, 3)}),
+    ]
+    for names1, names2, expected in cases:
+        l1 = [{'full_name': n} for n in names1]
+        l2 = [{'full_name': n} for n in names2]
+
+        assert ExactComparator(l1, l2).matches == expected
+        assert BoundedComparator(l1, l2).matches == expected
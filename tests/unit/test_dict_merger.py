@@ -29,7 +29,7 @@ from __future__ import absolute_import, print_function
 import pytest
 
 from json_merger.config import DictMergerOps
-from json_merger.conflict import Conflict, ConflictType
+from json_merger.conflict import Conflict, ConflictSink, ConflictType
 from inspire_dictdiffer.conflict import Conflict as Dictdiffer_Conflict
 from json_merger.dict_merger import SkipListsMerger
 from json_merger.errors import MergeError
@@ -924,3 +924,17 @@ def test_merge_handles_duplicated_remove_patches():
     m.merge()
 
     assert m.merged_root == {'foo': 'bar'}
+
+
+def test_merge_with_conflict_sink_does_not_raise():
+    sink = ConflictSink(path=('record', ))
+    m = SkipListsMerger({'a': 1}, {'a': 2}, {'a': 3},
+                        DictMergerOps.FALLBACK_KEEP_HEAD,
+                        conflict_sink=sink)
+
+    m.merge()
+
+    assert m.merged_root == {'a': 2}
+    assert m.conflicts == [Conflict(ConflictType.SET_FIELD, ('a', ), 3)]
+    assert sink.conflicts == [
+        Conflict(ConflictType.SET_FIELD, ('record', 'a'), 3)]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Test three-way diff of lists."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+
+from json_merger.diff3 import (
+    CONFLICT, STABLE, diff3, merge_chunks, myers_matches
+)
+
+
+@pytest.mark.parametrize('l1, l2, expected', [
+    ([], [], []),
+    ([1, 2, 3], [], []),
+    ([1, 2, 3], [1, 2, 3], [(0, 0), (1, 1), (2, 2)]),
+    ([1, 2, 3], [0, 1, 3, 4], [(0, 1), (2, 2)]),
+    (list('abcabba'), list('cbabac'), [(2, 0), (3, 2), (4, 3), (6, 4)]),
+])
+def test_myers_matches(l1, l2, expected):
+    assert myers_matches(l1, l2) == expected
+
+
+def test_diff3_non_overlapping_changes():
+    root = [1, 2, 3, 4, 5]
+    head = [0, 1, 9, 3, 4, 5]
+    update = [1, 2, 3, 5, 6]
+
+    chunks = diff3(root, head, update)
+
+    assert chunks == [(STABLE, [0, 1, 9, 3, 5, 6])]
+    assert merge_chunks(chunks) == [0, 1, 9, 3, 5, 6]
+
+
+def test_diff3_overlapping_changes():
+    root = [1, 2, 3]
+    head = [1, 7, 3, 4]
+    update = [1, 8, 3]
+
+    chunks = diff3(root, head, update)
+
+    assert chunks == [(STABLE, [1]), (CONFLICT, [2], [7], [8]),
+                      (STABLE, [3, 4])]
+    assert merge_chunks(chunks) == [1, 7, 3, 4]
+    assert merge_chunks(chunks, pick_head=False) == [1, 8, 3, 4]
+
+
+def test_diff3_same_change():
+    assert diff3([1, 2], [1, 3], [1, 3]) == [(STABLE, [1, 3])]
@@ -27,11 +27,17 @@
 
 from __future__ import absolute_import, print_function
 
+import time
+
 import pytest
 
-from json_merger.config import UnifierOps
-from json_merger.conflict import ConflictType
-from json_merger.comparator import PrimaryKeyComparator
+from json_merger.config import (
+    UnifierFallbackOps, UnifierLimits, UnifierOps
+)
+from json_merger.conflict import Conflict, ConflictSink, ConflictType
+from json_merger.comparator import (
+    BaseComparator, DefaultComparator, PrimaryKeyComparator
+)
 from json_merger.errors import MaxThresholdExceededError, MergeError
 from json_merger.list_unify import ListUnifier
 from json_merger.nothing import NOTHING
@@ -275,3 +281,280 @@ def test_transitive_equality():
                     UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST, Comp)
     u.unify()
     assert u.unified == [(only0, only1, both)]
+
+
+def test_no_stats():
+    root = [1, 2, 10]
+    head = [1, 3, 4, 2]
+    update = [1, 3, 5]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, stats=False)
+    u.unify()
+
+    assert u.unified == [(1, 1, 1), (NOTHING, 3, 3), (NOTHING, NOTHING, 5)]
+    assert u.head_stats is None
+    assert u.update_stats is None
+
+
+def test_no_stats_skips_unneeded_comparisons():
+    class CountingComparator(BaseComparator):
+        calls = []
+
+        def equal(self, obj1, obj2):
+            self.calls.append((obj1, obj2))
+            return obj1 == obj2
+
+    root = list(range(10))
+    head = list(range(10))
+    update = [0]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, CountingComparator,
+                    stats=False)
+    u.unify()
+
+    assert u.unified == [(0, 0, 0)]
+    # Only the rows of the matched elements were computed.
+    assert len(CountingComparator.calls) < len(root) * len(head)
+
+
+def test_limits_raise_before_matching():
+    class FailingComparator(BaseComparator):
+        def equal(self, obj1, obj2):
+            raise AssertionError('Should not compare anything')
+
+    limits = UnifierLimits(max_list_length=2)
+    u = ListUnifier([1, 2], [1, 2, 3], [1], UnifierOps.KEEP_ONLY_HEAD_ENTITIES,
+                    FailingComparator, limits=limits)
+
+    with pytest.raises(MaxThresholdExceededError) as excinfo:
+        u.unify()
+    assert 'List length 3 exceeds 2' in excinfo.value.message
+
+
+def test_limits_fallback_keep_head():
+    limits = UnifierLimits(max_comparisons=5,
+                           fallback=UnifierFallbackOps.KEEP_HEAD)
+    u = ListUnifier([1, 2], [1, 2, 3], [3, 4],
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, limits=limits)
+    u.unify()
+
+    assert u.unified == [(NOTHING, 1, NOTHING), (NOTHING, 2, NOTHING),
+                         (NOTHING, 3, NOTHING)]
+    assert u.head_stats.in_result == [1, 2, 3]
+    assert u.update_stats.not_in_result == [3, 4]
+
+
+def test_limits_fallback_keyed_only():
+    class Comp(PrimaryKeyComparator):
+        primary_key_fields = ['id']
+
+    root = [{'id': 1}]
+    head = [{'id': 1, 'a': 1}, {'id': 2}]
+    update = [{'id': 1}, {'id': 2}]
+
+    limits = UnifierLimits(max_list_length=1,
+                           fallback=UnifierFallbackOps.KEYED_ONLY)
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, Comp, limits=limits)
+    u.unify()
+
+    # The entities were matched on their primary keys.
+    assert u.unified == [({'id': 1}, {'id': 1, 'a': 1}, {'id': 1}),
+                         (NOTHING, {'id': 2}, {'id': 2})]
+
+
+def test_limits_fallback_keyed_only_without_keys():
+    class Comp(BaseComparator):
+        def equal(self, obj1, obj2):
+            return obj1 == obj2
+
+    limits = UnifierLimits(max_list_length=1,
+                           fallback=UnifierFallbackOps.KEYED_ONLY)
+    u = ListUnifier([1], [1, 2], [1, 3],
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, Comp, limits=limits)
+    u.unify()
+
+    assert u.unified == [(NOTHING, 1, NOTHING), (NOTHING, 2, NOTHING)]
+
+
+def test_limits_time_budget():
+    class SlowComparator(BaseComparator):
+        def equal(self, obj1, obj2):
+            time.sleep(0.01)
+            return obj1 == obj2
+
+    limits = UnifierLimits(time_budget=0.001,
+                           fallback=UnifierFallbackOps.KEEP_HEAD)
+    u = ListUnifier([1, 2], [1, 2, 3], [1, 2, 4],
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, SlowComparator,
+                    limits=limits)
+    u.unify()
+
+    assert u.unified == [(NOTHING, 1, NOTHING), (NOTHING, 2, NOTHING),
+                         (NOTHING, 3, NOTHING)]
+
+
+def test_limits_time_budget_in_process_lists():
+    compared = []
+
+    class SlowComparator(BaseComparator):
+        def process_lists(self):
+            for l1_idx, obj1 in enumerate(self.l1):
+                self.check_deadline()
+                compared.append(obj1)
+                time.sleep(0.01)
+                self.matches.update((l1_idx, l2_idx)
+                                    for l2_idx, obj2 in enumerate(self.l2)
+                                    if obj1 == obj2)
+
+    limits = UnifierLimits(time_budget=0.001,
+                           fallback=UnifierFallbackOps.KEEP_HEAD)
+    u = ListUnifier([1, 2], [1, 2, 3], [1, 2, 4],
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, SlowComparator,
+                    limits=limits)
+    u.unify()
+
+    assert u.unified == [(NOTHING, 1, NOTHING), (NOTHING, 2, NOTHING),
+                         (NOTHING, 3, NOTHING)]
+    # Matching stopped in the middle of the first list.
+    assert compared == [1]
+
+
+def test_limits_bad_fallback():
+    with pytest.raises(ValueError):
+        UnifierLimits(fallback='BAD_FALLBACK')
+
+
+def test_unordered_lists():
+    root = [1, 2]
+    head = [1, 2, 3]
+    update = [7, 3, 6, 1, 5, 2, 4]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                    ordered=False)
+    # No REORDER conflict is raised.
+    u.unify()
+
+    assert u.unified == [(1, 1, 1), (2, 2, 2), (NOTHING, 3, 3),
+                         (NOTHING, NOTHING, 7),
+                         (NOTHING, NOTHING, 6),
+                         (NOTHING, NOTHING, 5),
+                         (NOTHING, NOTHING, 4)]
+
+
+def test_unordered_lists_update_first():
+    root = [1]
+    head = [2, 1]
+    update = [1, 3]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_UPDATE_FIRST,
+                    ordered=False)
+    u.unify()
+
+    assert u.unified == [(1, 1, 1), (NOTHING, NOTHING, 3),
+                         (NOTHING, 2, NOTHING)]
+    assert sorted(u.head_stats.in_result) == [1, 2]
+
+
+def test_unordered_lists_multiple_match():
+    u = ListUnifier([], [1, 1, 2], [1, 2],
+                    UnifierOps.KEEP_ONLY_UPDATE_ENTITIES, ordered=False)
+    with pytest.raises(MergeError) as excinfo:
+        u.unify()
+
+    assert [c.conflict_type for c in excinfo.value.content] == [
+        ConflictType.MANUAL_MERGE, ConflictType.MANUAL_MERGE]
+    assert u.unified == [(NOTHING, 2, 2)]
+
+
+def test_unordered_lists_hash_join():
+    class FailingComparator(DefaultComparator):
+        def equal(self, obj1, obj2):
+            raise AssertionError('Should not compare anything')
+
+    root = [{'a': 1}, {'a': 2}]
+    head = [{'a': 2}, {'a': 3}, {'a': 1}]
+    update = [{'a': 1}, {'a': 4}]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                    FailingComparator, ordered=False)
+    u.unify()
+
+    assert sorted(u.unified, key=repr) == sorted([
+        ({'a': 1}, {'a': 1}, {'a': 1}),
+        ({'a': 2}, {'a': 2}, NOTHING),
+        (NOTHING, {'a': 3}, NOTHING),
+        (NOTHING, NOTHING, {'a': 4})], key=repr)
+
+
+def test_sorted_lists_merge_join():
+    class FailingComparator(BaseComparator):
+        def equal(self, obj1, obj2):
+            raise AssertionError('Should not compare anything')
+
+    root = [{'k': 1}, {'k': 2}, {'k': 4}]
+    head = [{'k': 1, 'h': 1}, {'k': 3}, {'k': 4}]
+    update = [{'k': 2}, {'k': 4, 'u': 1}, {'k': 5}]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                    FailingComparator, sort_key=lambda obj: obj['k'])
+    u.unify()
+
+    assert u.unified == [({'k': 1}, {'k': 1, 'h': 1}, NOTHING),
+                         ({'k': 2}, NOTHING, {'k': 2}),
+                         (NOTHING, {'k': 3}, NOTHING),
+                         ({'k': 4}, {'k': 4}, {'k': 4, 'u': 1}),
+                         (NOTHING, NOTHING, {'k': 5})]
+    assert sorted(u.head_stats.in_result_idx) == [0, 1, 2]
+    assert sorted(u.update_stats.in_result_idx) == [0, 1, 2]
+    assert u.head_stats.not_matched_root_objects == [{'k': 2}]
+
+
+def test_sorted_lists_keep_only_update():
+    root = [1, 2]
+    head = [1, 2, 3]
+    update = [2, 4]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_ENTITIES_CONFLICT_ON_HEAD_DELETE,
+                    sort_key=lambda obj: obj)
+    with pytest.raises(MergeError) as excinfo:
+        u.unify()
+
+    assert u.unified == [(2, 2, 2), (NOTHING, NOTHING, 4)]
+    assert [c.body for c in excinfo.value.content] == [1, 3]
+
+
+def test_sorted_lists_fallback_to_graph():
+    root = [1, 2]
+    head = [2, 1, 3]
+    update = [1, 2, 4]
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_UPDATE_FIRST,
+                    sort_key=lambda obj: obj)
+    with pytest.raises(MergeError) as excinfo:
+        u.unify()
+
+    assert excinfo.value.content[0].conflict_type == ConflictType.REORDER
+
+
+def test_conflict_sink_collects_without_raising():
+    root = [1, 2, 3]
+    head = [1, 2, 3]
+    update = [1, 2, 4]
+    sink = ConflictSink(path=('lst', ))
+
+    u = ListUnifier(root, head, update,
+                    UnifierOps.KEEP_UPDATE_ENTITIES_CONFLICT_ON_HEAD_DELETE,
+                    conflict_sink=sink)
+    u.unify()
+
+    assert sink.conflicts == [
+        Conflict(ConflictType.ADD_BACK_TO_HEAD, ('lst', ), 3)]
@@ -31,11 +31,17 @@ from __future__ import absolute_import, print_function
 import pytest
 
 
-from json_merger.config import DictMergerOps, UnifierOps
+from json_merger.comparator import PrimaryKeyComparator
+from json_merger.config import (
+    DictMergerOps, UnifierFallbackOps, UnifierLimits, UnifierOps
+)
 from json_merger.conflict import Conflict, ConflictType
-from json_merger.errors import MaxThresholdExceededError, MergeError
+from json_merger.errors import (
+    MaxThresholdExceededError, MergeAbortedError, MergeError
+)
 from json_merger.merger import Merger
 from json_merger.dict_merger import patch_to_conflict_set
+from json_merger.utils import KeyPathAccessor
 
 
 def test_merge_bare_int_lists():
@@ -237,3 +243,295 @@ def test_keep_head_conflict_on_new_update():
     expected_conflict = [('INSERT', (0,), 3)]
     assert m.merged_root == expected_merge
     assert m.conflicts == expected_conflict
+
+
+def test_merge_with_list_limits():
+    r = {'a': [1, 2], 'b': [1, 2]}
+    h = {'a': [1, 2, 3], 'b': [1, 2, 3]}
+    u = {'a': [1, 4], 'b': [1, 4]}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               list_limits={
+                   'a': UnifierLimits(
+                       max_list_length=2,
+                       fallback=UnifierFallbackOps.KEEP_HEAD)
+               })
+    m.merge()
+
+    assert m.merged_root == {'a': [1, 2, 3], 'b': [1, 4]}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               default_list_limits=UnifierLimits(max_list_length=2))
+    with pytest.raises(MaxThresholdExceededError):
+        m.merge()
+
+
+def test_merge_unordered_lists():
+    r = {'collections': ['a', 'b']}
+    h = {'collections': ['b', 'a', 'c']}
+    u = {'collections': ['a', 'd', 'b']}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+               unordered_lists=['collections'])
+    m.merge()
+
+    assert m.merged_root == {'collections': ['b', 'a', 'c', 'd']}
+    assert m.conflicts == []
+
+
+def test_merge_sorted_lists():
+    r = {'refs': [{'id': 1}, {'id': 3}]}
+    h = {'refs': [{'id': 1, 'note': 'x'}, {'id': 3}]}
+    u = {'refs': [{'id': 1}, {'id': 2}, {'id': 3, 'note': 'y'}]}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               sort_keys={'refs': lambda ref: ref['id']})
+    m.merge()
+
+    assert m.merged_root == {'refs': [{'id': 1, 'note': 'x'}, {'id': 2},
+                                      {'id': 3, 'note': 'y'}]}
+
+
+def test_merge_diff3_data_lists():
+    r = {'a': {'tags': ['a', 'b', 'c', 'd']}}
+    h = {'a': {'tags': ['x', 'a', 'b', 'c', 'd']}}
+    u = {'a': {'tags': ['a', 'b', 'd', 'y']}}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               diff3_data_lists=['a.tags'])
+    m.merge()
+
+    assert m.merged_root == {'a': {'tags': ['x', 'a', 'b', 'd', 'y']}}
+
+
+def test_merge_diff3_data_lists_conflict():
+    r = ['a', 'b', 'c']
+    h = ['a', 'x', 'c', 'd']
+    u = ['a', 'y', 'c']
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               diff3_data_lists=[''])
+    with pytest.raises(MergeError):
+        m.merge()
+
+    assert m.merged_root == ['a', 'x', 'c', 'd']
+    assert m.conflicts == [
+        Conflict(ConflictType.SET_FIELD, (), ['a', 'y', 'c', 'd'])]
+
+
+def test_merge_without_stats():
+    r = {'a': [1, 2]}
+    h = {'a': [1, 2, 3]}
+    u = {'a': [1, 4]}
+
+    m = Merger(r, h, u,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               collect_stats=False)
+    m.merge()
+
+    assert m.merged_root == {'a': [1, 4]}
+    assert m.head_stats == {}
+    assert m.update_stats == {}
+
+
+def test_merge_dry_run():
+    class BComparator(PrimaryKeyComparator):
+        primary_key_fields = ['b']
+
+    root = {'l': [{'b': 1}], 'a': 1, 'd': ['x', 'y']}
+    head = {'l': [{'b': 2}, {'c': 1}], 'a': 2, 'd': ['x', 'z', 'y']}
+    update = {'l': [{'b': 3}], 'a': 3, 'd': ['w', 'x', 'y']}
+
+    m = Merger(root, head, update,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+               comparators={'l': BComparator},
+               diff3_data_lists=['d'])
+    with pytest.raises(MergeError):
+        m.merge()
+
+    dry = Merger(root, head, update,
+                 DictMergerOps.FALLBACK_KEEP_HEAD,
+                 UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                 comparators={'l': BComparator},
+                 diff3_data_lists=['d'], dry_run=True)
+    with pytest.raises(MergeError) as excinfo:
+        dry.merge()
+
+    assert sorted(dry.conflicts) == sorted(m.conflicts)
+    assert excinfo.value.content == dry.conflicts
+    assert dry.merged_root is None
+    assert dry.aligned_root is None
+    assert dry.head_stats == {}
+    assert dry.update_stats == {}
+    # The objects are neither copied nor modified.
+    assert dry.head is head
+    assert head == {'a': 2, 'l': [{'b': 2}, {'c': 1}], 'd': ['x', 'z', 'y']}
+    assert list(head) == ['l', 'a', 'd']
+    assert list(update) == ['l', 'a', 'd']
+
+
+def test_merge_fail_fast():
+    root = {'a': 1, 'l': [{'b': 1}, {'b': 2}]}
+    head = {'a': 1, 'l': [{'b': 1, 'c': 1}, {'b': 2, 'c': 2}]}
+    update = {'a': 2, 'l': [{'b': 1, 'c': 3}, {'b': 2, 'c': 4}]}
+
+    class BComparator(PrimaryKeyComparator):
+        primary_key_fields = ['b']
+
+    m = Merger(root, head, update,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               comparators={'l': BComparator},
+               fail_fast_on=[ConflictType.SET_FIELD])
+    with pytest.raises(MergeAbortedError) as excinfo:
+        m.merge()
+
+    assert excinfo.value.key_path == ('l', 0, 'c')
+    assert excinfo.value.content == m.conflicts
+    assert m.conflicts == [Conflict(ConflictType.SET_FIELD, ('l', 0, 'c'), 3)]
+    assert m.merged_root is None
+
+
+def test_merge_fail_fast_ignores_other_types():
+    root = {'a': 1}
+    head = {'a': 2}
+    update = {'a': 3}
+
+    m = Merger(root, head, update,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_ONLY_UPDATE_ENTITIES,
+               fail_fast_on=[ConflictType.REORDER])
+    with pytest.raises(MergeError) as excinfo:
+        m.merge()
+
+    assert not isinstance(excinfo.value, MergeAbortedError)
+    assert m.merged_root == {'a': 2}
+
+
+def test_align_matches_merge_alignment():
+    root = {'a': 1, 'l': [{'b': 1}, {'b': 2}]}
+    head = {'a': 2, 'l': [{'b': 1, 'c': 1}, {'b': 3}]}
+    update = {'a': 3, 'l': [{'b': 4}, {'b': 1, 'c': 2}]}
+
+    class BComparator(PrimaryKeyComparator):
+        primary_key_fields = ['b']
+
+    def merger():
+        return Merger(root, head, update,
+                      DictMergerOps.FALLBACK_KEEP_HEAD,
+                      UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                      comparators={'l': BComparator})
+
+    m = merger()
+    with pytest.raises(MergeError):
+        m.merge()
+    a = merger()
+    a.align()
+
+    assert a.aligned_root == m.aligned_root
+    assert a.aligned_head == m.aligned_head
+    assert a.aligned_update == m.aligned_update
+    assert a.head_stats[('l', )].in_result == m.head_stats[('l', )].in_result
+    assert a.conflicts == []
+    assert a.merged_root is None
+    assert a.head == head
+
+
+def test_align_nested_lists():
+    root = {'l': [{'id': 1, 'tags': ['a', 'b']}]}
+    head = {'l': [{'id': 1, 'tags': ['a', 'b', 'c']}, {'id': 2, 'tags': []}]}
+    update = {'l': [{'id': 1, 'tags': ['x', 'b']}]}
+
+    class IdComparator(PrimaryKeyComparator):
+        primary_key_fields = ['id']
+
+    m = Merger(root, head, update,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+               comparators={'l': IdComparator})
+    m.align()
+
+    placeholder = '#$PLACEHOLDER$#'
+    assert m.aligned_root == {'l': [
+        {'id': 1, 'tags': ['a', placeholder, 'b', placeholder]},
+        placeholder]}
+    assert m.aligned_head == {'l': [
+        {'id': 1, 'tags': ['a', placeholder, 'b', 'c']},
+        {'id': 2, 'tags': []}]}
+    assert m.aligned_update == {'l': [
+        {'id': 1, 'tags': [placeholder, 'x', 'b', placeholder]},
+        placeholder]}
+    assert set(m.head_stats) == {('l', ), ('l', 0, 'tags')}
+
+
+def test_align_differs_from_merge_on_nested_lists():
+    root = {'l': [{'id': 1, 'tags': ['a', 'b']}]}
+    head = {'l': [{'id': 1, 'tags': ['a', 'b', 'c']}]}
+    update = {'l': [{'id': 1, 'tags': ['x', 'b']}]}
+
+    class IdComparator(PrimaryKeyComparator):
+        primary_key_fields = ['id']
+
+    def merger():
+        return Merger(root, head, update,
+                      DictMergerOps.FALLBACK_KEEP_HEAD,
+                      UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+                      comparators={'l': IdComparator})
+
+    m = merger()
+    m.merge()
+    a = merger()
+    a.align()
+
+    placeholder = '#$PLACEHOLDER$#'
+    # merge() keeps the nested lists as they are.
+    assert m.aligned_update == update
+    assert a.aligned_update == {'l': [
+        {'id': 1, 'tags': [placeholder, 'x', 'b', placeholder]}]}
+
+
+def test_merge_reuses_key_path_accessors(monkeypatch):
+    created = []
+
+    class CountingAccessor(KeyPathAccessor):
+        __slots__ = ()
+
+        def __init__(self, key_path):
+            created.append(tuple(key_path))
+            super(CountingAccessor, self).__init__(key_path)
+
+    monkeypatch.setattr('json_merger.merger.KeyPathAccessor',
+                        CountingAccessor)
+
+    class IdComparator(PrimaryKeyComparator):
+        primary_key_fields = ['id']
+
+    root = {'l': [{'id': 1, 't': [1]}, {'id': 2, 't': [2]}]}
+    head = {'l': [{'id': 1, 't': [1, 4]}, {'id': 2, 't': [2]}]}
+    update = {'l': [{'id': 1, 't': [1]}, {'id': 2, 't': [2, 5]}]}
+
+    m = Merger(root, head, update,
+               DictMergerOps.FALLBACK_KEEP_HEAD,
+               UnifierOps.KEEP_UPDATE_AND_HEAD_ENTITIES_HEAD_FIRST,
+               comparators={'l': IdComparator})
+    m.merge()
+
+    assert m.merged_root == {'l': [{'id': 1, 't': [1, 4]},
+                                   {'id': 2, 't': [2, 5]}]}
+    # One accessor per relative and absolute path, whatever the number of
+    # entities.
+    assert len(created) == len(set(created))
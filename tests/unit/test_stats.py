@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Inspirehep.
+# Copyright (C) 2016 CERN.
+#
+# Inspirehep is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Inspirehep is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Inspirehep; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Test list match stats."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+
+from json_merger.stats import ListMatchStats
+
+
+def _build_stats():
+    stats = ListMatchStats(['a', 'b', 'c', 'd'], ['B', 'C', 'X'])
+    stats.add_root_match(1, 0)
+    stats.add_root_match(2, 1)
+    stats.move_to_result(0)
+    stats.move_to_result(2)
+    return stats
+
+
+def test_stats_views():
+    stats = _build_stats().finalize()
+
+    assert stats.in_result_idx == {0, 2}
+    assert stats.in_result == ['a', 'c']
+    assert stats.not_in_result_idx == {1, 3}
+    assert stats.not_in_result == ['b', 'd']
+    assert stats.not_in_result_root_match_idx == {1}
+    assert stats.not_in_result_root_match == ['b']
+    assert stats.not_in_result_not_root_match_idx == {3}
+    assert stats.not_in_result_not_root_match == ['d']
+    assert stats.not_in_result_root_match_pairs == [('b', 'B')]
+    assert stats.not_matched_root_objects == ['X']
+    assert stats.root_matches == {1: 0, 2: 1}
+
+
+def test_stats_finalized_indices_are_cached():
+    stats = _build_stats()
+    assert stats.not_in_result_idx is not stats.not_in_result_idx
+
+    stats.finalize()
+    assert stats.not_in_result_idx is stats.not_in_result_idx
+
+
+def test_stats_finalized_views_are_not_shared():
+    stats = _build_stats().finalize()
+
+    stats.not_in_result.append('e')
+    stats.not_in_result_root_match_pairs.pop()
+    del stats.not_matched_root_objects[:]
+    stats.root_matches[3] = 0
+
+    assert stats.not_in_result == ['b', 'd']
+    assert stats.not_in_result_root_match_pairs == [('b', 'B')]
+    assert stats.not_matched_root_objects == ['X']
+    assert stats.root_matches == {1: 0, 2: 1}
+
+
+def test_finalized_stats_can_not_change():
+    stats = _build_stats().finalize()
+
+    with pytest.raises(ValueError):
+        stats.move_to_result(1)
+    with pytest.raises(ValueError):
+        stats.add_root_match(3, 2)
+    with pytest.raises(AttributeError):
+        stats.extra = 1
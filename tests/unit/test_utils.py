@@ -29,8 +29,10 @@ from __future__ import absolute_import, print_function
 import pytest
 
 from json_merger.utils import (
-    del_obj_at_key_path, get_obj_at_key_path, set_obj_at_key_path,
-    get_conf_set_for_key_path, remove_prefix, force_list)
+    ConfigTrie, KeyPath, KeyPathAccessor, del_obj_at_key_path,
+    del_objs_at_key_paths, get_obj_at_key_path, get_objs_at_key_paths,
+    set_obj_at_key_path, set_objs_at_key_paths, get_conf_set_for_key_path,
+    remove_prefix, force_list, get_list_fields, without_objs_at_key_paths)
 
 
 def test_del_obj_at_key_path():
@@ -129,3 +131,131 @@ def test_remove_prefix_value_error():
 def test_force_list(value, expected):
     result = force_list(value)
     assert result == expected
+
+
+def test_key_path_interns_children():
+    root = KeyPath()
+    path = root.extend(['a', 0, 'b', 1])
+
+    assert path is root.child('a').child(0).child('b').child(1)
+    assert path.parent.parent is root.extend(('a', 0))
+    assert path.tuple == ('a', 0, 'b', 1)
+    assert path.tuple is path.tuple
+    assert path.dotted == 'a.b'
+    assert root.tuple == ()
+    assert root.dotted == ''
+    assert list(path) == ['a', 0, 'b', 1]
+    assert len(path) == 4
+
+
+def test_key_path_with_objects():
+    obj = {'a': [{'b': 1}]}
+    path = KeyPath().extend(('a', 0, 'b'))
+
+    assert get_obj_at_key_path(obj, path) == 1
+
+
+def test_config_trie():
+    trie = ConfigTrie(['a', 'a.b.c', 'a.bc', 'd.e'])
+
+    assert 'a' in trie
+    assert 'a.b' not in trie
+    assert '' not in trie
+    assert sorted(trie.at(('a', 0, 'b'))) == ['c']
+    assert sorted(trie.at(['a'])) == ['', 'b.c', 'bc']
+    assert trie.at(['a']).terminal
+    assert not trie.at(['x', 'y'])
+    assert trie.at(('d', )) is trie.at(('d', 1))
+
+
+def test_config_trie_build_reuses_trie():
+    trie = ConfigTrie(['a'])
+
+    assert ConfigTrie.build(trie) is trie
+    assert list(ConfigTrie.build(None)) == []
+    assert list(ConfigTrie.build(['a.b'])) == ['a.b']
+
+
+def test_key_path_accessor():
+    obj = {'a': [{'b': 1}]}
+    accessor = KeyPathAccessor(('a', 0, 'b'))
+
+    assert accessor.get(obj) == 1
+    assert accessor.get({'a': []}, 'default') == 'default'
+    assert accessor.set(obj, 2) is obj
+    assert obj == {'a': [{'b': 2}]}
+    accessor.delete(obj)
+    assert obj == {'a': [{}]}
+    with pytest.raises(KeyError):
+        accessor.delete(obj)
+    with pytest.raises(KeyError):
+        accessor.set({'a': []}, 2)
+    assert accessor.set({'a': []}, 2, False) == {'a': []}
+    assert KeyPathAccessor(()).set(obj, 3) == 3
+    assert KeyPathAccessor(()).get(obj) is obj
+
+
+def test_get_objs_at_key_paths():
+    obj = {'a': {'b': [1], 'c': [2]}, 'd': 3}
+    key_paths = [('a', 'b'), ('a', 'c', 0), ('a', 'x', 'y'), ('d', ), ()]
+
+    assert get_objs_at_key_paths(obj, key_paths, 'default') == {
+        ('a', 'b'): [1],
+        ('a', 'c', 0): 2,
+        ('a', 'x', 'y'): 'default',
+        ('d', ): 3,
+        (): obj,
+    }
+
+
+def test_set_objs_at_key_paths():
+    obj = {'a': {'b': 1}}
+
+    result = set_objs_at_key_paths(obj, {('a', 'b'): 2, ('a', 'c'): 3,
+                                         ('d', ): 4})
+
+    assert result is obj
+    assert obj == {'a': {'b': 2, 'c': 3}, 'd': 4}
+
+
+def test_set_objs_at_key_paths_missing_parent():
+    obj = {'a': {}}
+
+    with pytest.raises(KeyError):
+        set_objs_at_key_paths(obj, {('a', 'b'): 1, ('x', 'y'): 2})
+    assert obj == {'a': {'b': 1}}
+
+    set_objs_at_key_paths(obj, {('x', 'y'): 2}, raise_key_error=False)
+    assert obj == {'a': {'b': 1}}
+
+
+def test_del_objs_at_key_paths():
+    obj = {'a': {'b': 1, 'c': 2, 'd': 3}}
+
+    del_objs_at_key_paths(obj, [('a', 'b'), ('a', 'c')])
+    assert obj == {'a': {'d': 3}}
+
+    with pytest.raises(KeyError):
+        del_objs_at_key_paths(obj, [('a', 'b')])
+    del_objs_at_key_paths(obj, [('a', 'b'), ('x', 'y')], False)
+    assert obj == {'a': {'d': 3}}
+
+
+def test_without_objs_at_key_paths():
+    obj = {'l': [1], 'a': {'b': [2], 'c': {'d': 3}}, 'e': 4}
+
+    result = without_objs_at_key_paths(obj, [('l', ), ('a', 'b'),
+                                             ('x', 'y')])
+
+    assert result == {'a': {'c': {'d': 3}}, 'e': 4}
+    assert result['a']['c'] is obj['a']['c']
+    assert obj == {'l': [1], 'a': {'b': [2], 'c': {'d': 3}}, 'e': 4}
+    assert list(obj) == ['l', 'a', 'e']
+
+
+def test_get_list_fields():
+    obj = {'a': [{'b': []}], 'c': {'d': [], 'e': 1}, 'f': 2}
+
+    assert sorted(get_list_fields(obj)) == [('a', ), ('c', 'd')]
+    assert get_list_fields([1]) == [()]
+    assert get_list_fields(1) == []